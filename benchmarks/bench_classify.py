@@ -0,0 +1,86 @@
+#!/usr/bin/env python
+from __future__ import print_function, division, unicode_literals
+'''
+Compare line classification speed: running every searches pattern on every
+line (the old searches object) against classify().
+
+	python benchmarks/bench_classify.py [number of lines]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath(__file__) ), ".." ) )
+import kol_parse
+from kol_parse import searches
+
+# A mix of the lines found in a session log, roughly in real proportions.
+sample_lines = (
+	"[kol_parse]; Muscle=150; Mysticality=75; Moxie=85; ml=25; enc=-5; init=40; real_init=35; exp=3.5; meat=50; item=75.5;",
+	"[%d] The Smut Orc Logging Camp",
+	"Encounter: smut orc nailer",
+	"Round 0: player wins initiative!",
+	"Round 1: player attacks!",
+	"Round 2: smut orc nailer takes 25 damage.",
+	"Round 3: smut orc nailer takes 31 damage.",
+	"Round 3: player wins the fight!",
+	"You gain 45 Meat",
+	"You acquire an item: orcish nailing lube",
+	"You gain 12 Strongness",
+	"You gain 5 Magicalness",
+	"You gain 6 Roguishness",
+	"",
+	"mall search orcish nailing lube",
+	"use 1 chocolate",
+	"You acquire an effect: Disco Concentration (duration: 10 Adventures)",
+	"equip acc1 stinky cheese eye",
+	"buy 1 chocolate for 100 each from 3 in 1 shop",
+)
+
+def synthetic_lines(count, seed=1):
+	r = random.Random(seed)
+	lines = []
+	adventure = 0
+	while len(lines) < count:
+		adventure += 1
+		for line in sample_lines:
+			if "%d" in line:
+				line = line % adventure
+			elif r.random() < 0.2:
+				continue
+			lines.append(line)
+	return lines[:count]
+
+patterns = [
+	getattr(searches, name) for name in dir(searches)
+	if name.startswith("re_") and not name.endswith("_bytes") ]
+
+def searchall(line):
+	'''What the old searches object did for every line.'''
+	found = [ pattern.search(line) for pattern in patterns ]
+	if searches.re_bbs_tag.search(line):
+		start = 0
+		while True:
+			match = searches.re_bbs_info.search( line, start )
+			if not match:
+				break
+			start = match.end()
+	return found
+
+def rate(func, lines):
+	start = time.time()
+	for line in lines:
+		func(line)
+	return len(lines) / ( time.time() - start )
+
+def main():
+	count = int( sys.argv[1] ) if len(sys.argv) > 1 else 1000000
+	lines = synthetic_lines(count)
+	print( "%d synthetic lines" % len(lines) )
+	print( "every pattern: %10.0f lines/s" % rate( searchall, lines ) )
+	print( "classify():    %10.0f lines/s" % rate( kol_parse.classify, lines ) )
+
+if __name__ == "__main__":
+	main()
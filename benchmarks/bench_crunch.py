@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+from __future__ import print_function, division, unicode_literals
+'''
+Compare crunching monster statistics one monster at a time in Python against
+crunch_monsters() with numpy, and check that they agree.
+
+	python benchmarks/bench_crunch.py [number of encounters] [number of monsters]
+'''
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert( 0, os.path.join( os.path.dirname( os.path.abspath(__file__) ), ".." ) )
+import kol_parse
+from kol_parse import monster
+
+def synthetic_monsters(encounters, count, seed=1):
+	'''Build monsters with random columns, as if they had been analyzed.'''
+	r = random.Random(seed)
+	monsters = [ monster( "monster %d" % i, i ) for i in range(count) ]
+	for n in range(encounters):
+		mon = monsters[ r.randrange(count) ]
+		mon.encountered += 1
+		initiative = ( r.randint(-20, 150), r.randint(50, 400), r.choice([0, 25, 45, 70]) )
+		if r.random() < 0.5:
+			mon.gotjump.extend( initiative )
+		else:
+			mon.gotjumped.extend( initiative )
+		if r.random() < 0.9:
+			mon.defeated += 1
+			mon.stats.append( r.uniform(5, 60) )
+			mon.meatdrops.append( r.randint(0, 120) )
+			mon.meatmults.append( r.choice([1.0, 1.5, 2.25]) )
+	return monsters
+
+def results(monsters):
+	return [ ( list(mon.stats), mon.stat, mon.level, list(mon.meats), mon.meat,
+		mon.jump_inits, mon.jumped_inits, mon.initguess ) for mon in monsters ]
+
+def main():
+	encounters = int( sys.argv[1] ) if len(sys.argv) > 1 else 1000000
+	count = int( sys.argv[2] ) if len(sys.argv) > 2 else 200
+	print( "%d encounters of %d monsters" % (encounters, count) )
+	monsters = synthetic_monsters(encounters, count)
+	start = time.time()
+	for mon in monsters:
+		mon.crunch()
+	print( "monster.crunch():  %.3f s" % ( time.time() - start ) )
+	expected = results(monsters)
+	if kol_parse.load_numpy() is None:
+		print( "numpy is not installed" )
+		return
+	monsters = synthetic_monsters(encounters, count)
+	start = time.time()
+	kol_parse.crunch_monsters(monsters)
+	print( "crunch_monsters(): %.3f s" % ( time.time() - start ) )
+	print( "same results: %s" % ( results(monsters) == expected ) )
+
+if __name__ == "__main__":
+	main()
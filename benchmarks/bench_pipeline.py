@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+from __future__ import print_function, division, unicode_literals
+'''
+Time each stage of kol_parse on synthetic session logs: parselines(),
+analyze_monsters() and writing the HTML report.  Prints the throughput and
+peak memory of every stage and saves them as JSON, so runs from different
+commits can be compared.
+
+	python benchmarks/bench_pipeline.py [--lines 10K,100K,1M] [--seed 1]
+		[--data DIR] [--output results.json] [--compare old.json]
+
+Generated logs are kept in --data (benchmarks/data by default) and reused.
+'''
+
+import argparse
+import gc
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+here = os.path.dirname( os.path.abspath(__file__) )
+sys.path.insert( 0, os.path.join( here, ".." ) )
+import kol_parse
+from kol_parse.files import open_logs, log_lines
+from synthetic_log import write_log
+
+results_version = 1
+
+def parse_size(text):
+	'''Turn "10K" or "1M" into a number of lines.'''
+	text = text.strip().upper()
+	for suffix, multiplier in ( ("K", 1000), ("M", 1000000) ):
+		if text.endswith(suffix):
+			return int( float( text[:-1] ) * multiplier )
+	return int(text)
+
+def log_path(directory, lines, seed):
+	'''Return the path of the synthetic log, writing it first if needed.'''
+	path = os.path.join( directory, "synthetic_%d_%d.txt" % (lines, seed) )
+	if not os.path.exists(path):
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		print( "writing %s" % path )
+		with io.open( path + ".tmp", "w", encoding="utf-8" ) as out:
+			write_log( out, lines, seed )
+		os.rename( path + ".tmp", path )
+	return path
+
+def stage(func, memory):
+	'''Run func() and return its result and a dict with its wall time and,
+	if memory is set, the peak bytes it allocated.  Tracing allocations slows
+	everything down a lot, so that is done in a second run.'''
+	gc.collect()
+	start = time.time()
+	result = func()
+	timing = { "seconds": time.time() - start }
+	if memory:
+		gc.collect()
+		tracemalloc.start()
+		func()
+		timing["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+	return result, timing
+
+def run(path, lines, memory):
+	'''Time the stages on the log at path.'''
+	size = os.path.getsize(path)
+	def parse():
+		encounters = []
+		for name, f, tell in open_logs(path):
+			encounters.extend( kol_parse.parselines( log_lines(f) ) )
+		return encounters
+	encounters, parsing = stage( parse, memory )
+	parsing["lines_per_s"] = lines / parsing["seconds"]
+	parsing["bytes_per_s"] = size / parsing["seconds"]
+	parsing["encounters"] = len(encounters)
+	def analyze():
+		analysis = kol_parse.analyzer()
+		for enc in encounters:
+			analysis.add( enc )
+		return analysis, analysis.monsters()
+	(analysis, monsters), analyzing = stage( analyze, memory )
+	analyzing["encounters_per_s"] = len(encounters) / analyzing["seconds"]
+	analyzing["monsters"] = len(monsters)
+	reportpath = path + ".html"
+	def write():
+		rep = kol_parse.report( reportpath )
+		rep.write( kol_parse.templates.head )
+		kol_parse.write_report( rep, monsters, analysis )
+		rep.close()
+	dummy, writing = stage( write, memory )
+	writing["bytes"] = os.path.getsize(reportpath)
+	writing["bytes_per_s"] = writing["bytes"] / writing["seconds"]
+	os.remove(reportpath)
+	return {
+		"lines": lines, "bytes": size, "stages": {
+			"parselines": parsing, "analyze_monsters": analyzing, "html": writing } }
+
+def peak_rss():
+	'''Return the peak resident memory of this process in bytes, or None.'''
+	try:
+		import resource
+	except ImportError:
+		return None
+	rss = resource.getrusage( resource.RUSAGE_SELF ).ru_maxrss
+	# Linux reports kilobytes, macOS bytes
+	return rss if sys.platform == "darwin" else rss * 1024
+
+def commit():
+	try:
+		return subprocess.check_output(
+			[ "git", "rev-parse", "--short", "HEAD" ], cwd=here,
+			stderr=subprocess.STDOUT ).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+def show(run, old=None):
+	print( "%d lines, %.1f MB" % ( run["lines"], run["bytes"] / 1e6 ) )
+	for name in ( "parselines", "analyze_monsters", "html" ):
+		timing = run["stages"][name]
+		rate = [ key for key in timing if key.endswith("_per_s") ][0]
+		st = "  %-17s %8.3f s  %12.0f %s" % ( name, timing["seconds"], timing[rate], rate )
+		if "peak_bytes" in timing:
+			st += "  peak %7.1f MB" % ( timing["peak_bytes"] / 1e6 )
+		if old:
+			st += "  (%.2fx)" % ( old["stages"][name]["seconds"] / timing["seconds"] )
+		print( st )
+
+def main():
+	parser = argparse.ArgumentParser(
+			description="Time kol_parse on synthetic session logs." )
+	parser.add_argument( "--lines", default="10K,100K,1M",
+			help="comma separated log sizes in lines, like 10K,1M,10M" )
+	parser.add_argument( "--seed", type=int, default=1 )
+	parser.add_argument( "--data", default=os.path.join( here, "data" ), metavar="DIR",
+			help="where to keep the generated logs" )
+	parser.add_argument( "--output", metavar="JSON", help="save the results here" )
+	parser.add_argument( "--compare", metavar="JSON",
+			help="show the speedup over the results saved by an earlier run" )
+	parser.add_argument( "--no-memory", dest="memory", action="store_false",
+			help="don't trace allocations, which slows the stages down" )
+	args = parser.parse_args()
+	old = {}
+	if args.compare:
+		with io.open( args.compare, encoding="utf-8" ) as f:
+			for old_run in json.load(f)["runs"]:
+				old[ old_run["lines"] ] = old_run
+	# numpy takes a while to import, which shouldn't count against a stage.
+	kol_parse.load_numpy()
+	runs = []
+	for lines in [ parse_size(size) for size in args.lines.split(",") ]:
+		path = log_path( args.data, lines, args.seed )
+		result = run( path, lines, args.memory )
+		result["seed"] = args.seed
+		runs.append( result )
+		show( result, old.get(lines) )
+	results = {
+		"version": results_version,
+		"commit": commit(),
+		"time": time.strftime( "%Y-%m-%dT%H:%M:%S" ),
+		"python": platform.python_version(),
+		"numpy": kol_parse.load_numpy() is not None,
+		"traced_memory": args.memory,
+		"peak_rss_bytes": peak_rss(),
+		"runs": runs }
+	print( "peak RSS %.1f MB" % ( (results["peak_rss_bytes"] or 0) / 1e6 ) )
+	if args.output:
+		with io.open( args.output, "w", encoding="utf-8" ) as f:
+			f.write( json.dumps( results, indent=1, sort_keys=True ) )
+
+if __name__ == "__main__":
+	main()
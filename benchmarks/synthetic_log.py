@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+from __future__ import print_function, division, unicode_literals
+'''
+Write a synthetic KoLMafia session log for benchmarking.  The same number of
+lines and seed always give the same log.
+
+	python benchmarks/synthetic_log.py [number of lines] [seed] > session.txt
+'''
+
+import io
+import random
+import sys
+
+# location: (monsters, items they drop)
+locations = {
+	"The Smut Orc Logging Camp": (
+		( "smut orc nailer", "smut orc jacker", "smut orc pipelayer", "smut orc screwer" ),
+		( "orcish nailing lube", "long hard screw", "weirdwood plank", "orc wrist",
+			"morningwood plank", "thick caulk" ) ),
+	"Cobb's Knob Barracks": (
+		( "Knob Goblin Elite Guard", "Knob Goblin Elite Guard Captain", "Knob Goblin Harem Girl" ),
+		( "Knob Goblin elite pants", "Knob Goblin elite helm", "Knob Goblin elite polearm" ) ),
+	"The Goatlet": (
+		( "dairy goat", "drunk goat" ),
+		( "goat cheese", "glass of goat's milk" ) ),
+	"Hobopolis Town Square": (
+		( "normal hobo", "hobo &amp; friend" ),
+		( "hobo nickel", "hobo code binder" ) ),
+	"The Haunted Pantry": (
+		( "possessed can of tomatoes", "fiendish can of asparagus", "W imp" ),
+		( "tomato", "asparagus", "dodecagram" ) ),
+}
+
+everything = sorted( set( [ thing for monsters, items in locations.values() for thing in items ] ) )
+
+stat_words = (
+	( "Beefiness", "Enchantedness", "Cheek" ),
+	( "Strongness", "Magicalness", "Roguishness" ),
+	( "Muscleboundness", "Wizardliness", "Chutzpah" ) )
+
+noise = (
+	"mall search goat cheese",
+	"use 1 chocolate",
+	"equip acc1 stinky cheese eye",
+	"buy 1 chocolate for 100 each from 3 in 1 shop",
+	"cast 1 The Moxious Madrigal" )
+
+class player(object):
+	'''The modifiers that show up in the log's metadata lines.'''
+	def __init__(self, r):
+		self.r = r
+		self.stats = [ 150, 80, 90 ]
+		self.ml = 0
+		self.combat = 0
+		self.init = 0
+		self.meat = 50.0
+		self.item = 75.5
+	def change(self):
+		r = self.r
+		self.ml = r.choice( (0, 25, 45, 70, 90, 120) )
+		self.combat = r.choice( (-20, -5, 0, 5) )
+		self.init = r.randint( -20, 150 )
+		self.meat = r.choice( (0.0, 50.0, 120.0) )
+		self.item = r.choice( (0.0, 50.0, 75.5, 120.0) )
+	def login(self):
+		'''The lines of "Session log records your player's state on login".'''
+		return [
+			"Class: Seal Clubber",
+			"Mus: %d (%d), tnp = 50" % ( self.stats[0] + 12, self.stats[0] ),
+			"Mys: %d, tnp = 10" % self.stats[1],
+			"Mox: %d (%d), tnp = 12" % ( self.stats[2] + 5, self.stats[2] ),
+			"%s bonus today" % self.r.choice( ("Muscle", "Mysticality", "Moxie") ),
+			"ML: %+d" % self.ml,
+			"Enc: %+d" % self.combat,
+			"Init: %+d%%" % self.init,
+			"Exp: +3.5",
+			"Meat: %+.1f%%" % self.meat,
+			"Item: %+.1f%%" % self.item,
+			"" ]
+	def bbs(self):
+		'''The line that bbs_kol_parse.ash prints before every adventure.'''
+		return (
+			"[kol_parse]; Muscle=%d; Mysticality=%d; Moxie=%d; ml=%d; enc=%d; "
+			"init=%d; real_init=%d; exp=3.5; meat=%.1f; item=%.1f;" % (
+				self.stats[0], self.stats[1], self.stats[2], self.ml, self.combat,
+				self.init, self.init - max( self.ml - 20, 0 ), self.meat, self.item ) )
+
+def adventure(r, num, you):
+	'''Return the lines of one adventure.'''
+	location = r.choice( sorted(locations) )
+	monsters, items = locations[location]
+	lines = []
+	if r.random() < 0.3:
+		lines.append( r.choice(noise) )
+	if r.random() < 0.05:
+		lines.append( "You acquire an effect: Disco Concentration (duration: 10 Adventures)" )
+	if r.random() < 0.8:
+		lines.append( you.bbs() )
+	lines.append( "[%d] %s" % ( num, location ) )
+	if r.random() < 0.1:
+		lines.append( "Encounter: A Noncombat &amp; Stuff" )
+		lines.append( "You acquire an item: %s" % r.choice(everything) )
+		return lines
+	name = r.choice( monsters )
+	lines.append( "Encounter: %s" % name )
+	if r.random() < 0.5:
+		lines.append( "Round 0: player wins initiative!" )
+	else:
+		lines.append( "Round 0: %s takes the initiative." % name )
+	lines.append( "Round 1: player attacks!" )
+	if r.random() < 0.1:
+		lines.append( "Round 1: Fluffy tries to steal an item!" )
+		lines.append( "You acquire an item: %s" % r.choice(items) )
+	if r.random() < 0.03:
+		lines.append( "Round 1: Frank brokers a quick deal, and splits the profits with you." )
+		lines.append( "You acquire an item: %s" % r.choice(items) )
+	if r.random() < 0.03:
+		lines.append( "Rave combo: Rave Steal" )
+		lines.append( "You acquire an item: %s" % r.choice(items) )
+	if r.random() < 0.1:
+		lines.append( "You lose %d hit points" % r.randint(1, 20) )
+	rounds = r.randint( 1, 4 )
+	for n in range( 2, 2 + rounds ):
+		lines.append( "Round %d: %s takes %d damage." % ( n, name, r.randint(1, 60) ) )
+	if r.random() < 0.1:
+		lines.append( "Round %d: %s beats you up!" % ( n + 1, name ) )
+		lines.append( "You lose %d hit points" % r.randint(30, 90) )
+		return lines
+	lines.append( "Round %d: player wins the fight!" % n )
+	lines.append( "You gain %d Meat" % r.randint(10, 150) )
+	for k in range( r.randint(0, 2) ):
+		if r.random() < 0.15:
+			lines.append( "You acquire %s (%d)" % ( r.choice(items), r.randint(2, 3) ) )
+		else:
+			lines.append( "You acquire an item: %s" % r.choice(items) )
+	words = r.choice( stat_words )
+	for whichstat in range(3):
+		lines.append( "You gain %d %s" % ( r.randint(1, 30), words[whichstat] ) )
+	if r.random() < 0.1:
+		whichstat = r.randrange(3)
+		you.stats[whichstat] += 1
+		lines.append( "You gain a %s point!" % ( "Muscle", "Mysticality", "Moxie" )[whichstat] )
+	return lines
+
+def write_log(out, count, seed=1):
+	'''Write at least count lines of log to the text file out, stopping at
+	the end of an adventure.  Return the number of lines written.'''
+	r = random.Random(seed)
+	you = player(r)
+	written = 0
+	num = 0
+	lines = you.login()
+	while True:
+		out.write( "\n".join(lines) + "\n" )
+		written += len(lines)
+		if written >= count:
+			return written
+		lines = []
+		if r.random() < 0.005:
+			you.change()
+			lines.extend( you.login() )
+		num += r.choice( (1, 1, 1, 2) )
+		lines.extend( adventure(r, num, you) )
+		if r.random() < 0.9:
+			lines.append( "" )
+
+def main():
+	count = int( sys.argv[1] ) if len(sys.argv) > 1 else 10000
+	seed = int( sys.argv[2] ) if len(sys.argv) > 2 else 1
+	out = io.open( sys.stdout.fileno(), "w", encoding="utf-8", closefd=False )
+	write_log( out, count, seed )
+	out.flush()
+
+if __name__ == "__main__":
+	main()
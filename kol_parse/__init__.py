@@ -0,0 +1,62 @@
+'''
+Parse a KoLMafia log of one or more encounters and produce a report of
+things like stat gains, meat drop, and item drop rates.
+
+For best results, turn on "Session log records your player's state on login"
+in preferences, and restart whenever your modifiers change.
+
+Things to watch out for:
+*	How to properly detect the end of a fight?
+	*	Possible (maybe partial) fix: when getting meat or items, check that we
+		haven't already gotten stats.
+*	Your familiar's actions can screw up the script if its name is something
+	like, "You acquire an item:".  Why would you do such a thing?
+*	Monsters with randomized names, e.g. hobos and elfs, are not
+	identified properly if they don't take any damage.
+
+Use it from python like this:
+
+	import kol_parse
+	with open( "session.txt" ) as f:
+		analysis = kol_parse.analyze( kol_parse.parse(f) )
+	for mon in analysis.monsters():
+		print( mon.overview() )
+
+Nothing is set up until it is needed, and every parse() and analyze() call
+has its own state, so many can run at once.  The command line is in
+__main__.py.
+
+Tested in Python 3.3
+'''
+# Not unicode_literals: python 2 wants the names in __all__ to be native
+# strings.
+from __future__ import print_function, division
+
+from .parser import (
+	toolbox, searches, linematch, lineiter, encounter, metadata_class,
+	unescape, statnum, statword, classify, parse_encounter, parselines,
+	parse )
+from .analysis import (
+	monster, monster_summary, item, snapshots, analyzer, load_numpy, crunch_monsters, analyze,
+	analyze_monsters )
+from .symbols import symbols, memoized, intern_name
+from .groups import group_rules, default_rules
+from .report import templates, report, write_report
+from .progress import progress_meter
+from .profiling import profiler
+from .files import (
+	open_logs, log_lines, is_plain, encounter_cache, seen_encounters, split_log,
+	parse_files, follow, save_partial, load_partial, merge_partials )
+from .index import adventure_index, index_path, parse_adventures
+
+__all__ = [
+	"toolbox", "searches", "linematch", "lineiter", "encounter",
+	"metadata_class", "unescape", "statnum", "statword", "classify",
+	"parse_encounter", "parselines", "parse", "monster", "monster_summary",
+	"item", "snapshots", "analyzer", "load_numpy", "crunch_monsters",
+	"analyze", "analyze_monsters", "symbols", "memoized", "intern_name",
+	"group_rules", "default_rules", "templates", "report", "write_report",
+	"progress_meter", "profiler", "open_logs", "log_lines", "is_plain",
+	"encounter_cache", "seen_encounters", "split_log", "parse_files", "follow",
+	"save_partial", "load_partial", "merge_partials", "adventure_index",
+	"index_path", "parse_adventures" ]
@@ -0,0 +1,239 @@
+'''
+The kol_parse command line: python -m kol_parse [log files]
+'''
+from __future__ import print_function, division, unicode_literals
+
+import os
+import time
+import argparse
+
+from .analysis import analyzer
+from .report import templates, report, write_report
+from .files import (
+	encounter_cache, seen_encounters, parse_files, follow, is_plain, save_partial,
+	merge_partials )
+from .index import parse_adventures
+from .groups import default_rules
+from .progress import progress_meter
+from .profiling import profiler, timed
+
+try:
+	from .ingest import ingest
+except (ImportError, SyntaxError):
+	# ingest needs asyncio and python 3.5
+	ingest = None
+
+try:
+	from .database import encounter_db
+except ImportError:
+	# python was built without sqlite3
+	encounter_db = None
+
+#Functions
+
+def adventure_range(text):
+	'''Read the FIRST-LAST or FIRST- of --adventures as (first, last), where
+	last is None for the end of the log.'''
+	first, dash, last = text.partition("-")
+	try:
+		first = int(first)
+		last = int(last) if last else None
+	except ValueError:
+		raise argparse.ArgumentTypeError( "%r isn't FIRST-LAST or FIRST-" % text )
+	if not dash or last is not None and last < first:
+		raise argparse.ArgumentTypeError( "%r isn't FIRST-LAST or FIRST-" % text )
+	return first, last
+
+#Main
+
+def main():
+	parser = argparse.ArgumentParser(
+			description="Parse KoLMafia session logs and write an HTML report." )
+	parser.add_argument( "paths", nargs="*", metavar="log",
+			help="session log files, in order" )
+	parser.add_argument( "-j", "--jobs", type=int, default=1,
+			help="number of processes to parse with (default 1; needs python 3.5)" )
+	parser.add_argument( "--cache", metavar="DIR",
+			help="keep parsed logs in DIR and skip parsing unchanged ones" )
+	parser.add_argument( "--cache-size", type=int, default=256, metavar="MB",
+			help="delete the least recently used cache entries past this size (default 256)" )
+	parser.add_argument( "-f", "--follow", action="store_true",
+			help="only parse what was added to the log since the last --follow run" )
+	parser.add_argument( "--adventures", type=adventure_range, metavar="FIRST-LAST",
+			help="only analyze adventures FIRST to LAST (or FIRST- for the rest); "
+				"logs are indexed in kol_parse_<log>.index so the rest isn't parsed" )
+	parser.add_argument( "--no-trace", dest="trace", action="store_false",
+			help="leave out the list of every analyzed and skipped encounter" )
+	parser.add_argument( "--no-details", dest="details", action="store_false",
+			help="leave out the Details section, and only keep counts of each "
+				"distinct value; with --no-trace, memory doesn't grow with the "
+				"number of encounters" )
+	parser.add_argument( "--groups", metavar="FILE", action="append", default=[],
+			help="also count the groups of monsters and items in FILE, a JSON "
+				"file like kol_parse/groups.json (can be given more than once)" )
+	parser.add_argument( "--seen", metavar="FILE",
+			help="remember the logs and encounters analyzed in FILE, and skip "
+				"them in later runs (repeats across logs are always skipped)" )
+	parser.add_argument( "--partial", action="store_true",
+			help="also save the counts in kol_parse_<log>.partial.json, for --merge" )
+	parser.add_argument( "--merge", action="store_true",
+			help="the files are partials saved with --partial; merge them into "
+				"one report, kol_parse_merged.html" )
+	parser.add_argument( "--db", metavar="FILE",
+			help="also save the parsed encounters in the SQLite database FILE" )
+	parser.add_argument( "--query", metavar="SQL",
+			help="run SQL on the --db database and print the rows, instead of "
+				"parsing logs" )
+	parser.add_argument( "-q", "--quiet", dest="progress", action="store_const",
+			const=progress_meter.silent, default=progress_meter.summary,
+			help="don't show how parsing is going" )
+	parser.add_argument( "-v", "--verbose", dest="progress", action="store_const",
+			const=progress_meter.debug,
+			help="show every adventure as it is parsed" )
+	parser.add_argument( "--profile", action="store_true",
+			help="time each stage, add a Performance section to the report and "
+				"save the numbers in kol_parse_<log>.profile.json" )
+	args = parser.parse_args()
+	paths = args.paths
+	db = None
+	if args.adventures and ( args.merge or args.follow or args.db or args.seen or args.cache ):
+		parser.error( "--adventures can't be used with --merge, --follow, --db, --seen or --cache" )
+	if args.db or args.query:
+		if encounter_db is None:
+			parser.error( "--db needs python's sqlite3 module" )
+		if not args.db:
+			parser.error( "--query needs --db" )
+		if args.merge or args.follow:
+			parser.error( "--db can't be used with --merge or --follow" )
+		try:
+			db = encounter_db( args.db )
+		except ValueError as e:
+			parser.error( str(e) )
+	if args.seen and ( args.merge or args.follow ):
+		parser.error( "--seen can't be used with --merge or --follow" )
+	if args.groups and args.merge:
+		parser.error( "--groups can't be used with --merge; give it to the runs that save the partials" )
+	groups = default_rules()
+	if args.groups:
+		groups = groups.copy()
+		for path in args.groups:
+			try:
+				groups.load( path )
+			except (IOError, OSError, ValueError) as e:
+				parser.error( str(e) )
+	if args.query:
+		columns, rows = db.query( args.query )
+		print( "\t".join(columns) )
+		for row in rows:
+			print( "\t".join( [str(value) for value in row] ) )
+		db.close()
+		return
+	if not paths:
+		while True:
+			path = input( "File to parse: " ).strip()
+			if path:
+				paths.append( path )
+			else:
+				break
+	if not paths or not paths[0]:
+		return
+	fn_dot = paths[0].rfind('.')
+	fn_start = 1 + paths[0].rfind(os.sep)
+	fn_end = fn_dot if fn_dot > fn_start else len( paths[0] )
+	fn = paths[0][fn_start:fn_end]
+	if args.merge:
+		fn = "merged"
+	elif args.adventures:
+		fn += "_%d-%s" % ( args.adventures[0], args.adventures[1] or "" )
+	logpath = paths[0][:fn_start] + "kol_parse_" + fn + ".html"
+	progress = progress_meter( args.progress )
+	profile = profiler() if args.profile else None
+	if args.merge:
+		if args.follow:
+			parser.error( "--merge can't be used with --follow" )
+		try:
+			with timed( profile, "merge_partials", len(paths) ):
+				analysis = merge_partials( paths )
+		except ValueError as e:
+			parser.error( str(e) )
+	elif args.follow:
+		if len(paths) != 1:
+			parser.error( "--follow takes exactly one log" )
+		if not is_plain( paths[0] ):
+			parser.error( "--follow only works with logs that aren't compressed or archived" )
+		statepath = paths[0][:fn_start] + "kol_parse_" + fn + ".state"
+		analysis = follow( paths[0], statepath, args.trace, progress, profile, args.details, groups )
+	else:
+		cache = None
+		if args.cache:
+			cache = encounter_cache( args.cache, args.cache_size << 20 )
+		analysis = analyzer( args.trace, args.details, groups )
+		seen = None
+		if args.seen or len(paths) > 1:
+			# One log can't overlap with anything, so don't bother.
+			seen = seen_encounters( args.seen )
+		if args.adventures:
+			first, last = args.adventures
+			with timed( profile, "parse_adventures", len(paths) ):
+				for path in paths:
+					if seen is not None and not seen.new_file(path):
+						progress.message( "\n*** Already seen: %s\n" % path )
+						continue
+					encounters = parse_adventures( path, first, last, progress, profile )
+					if seen is not None:
+						encounters = seen.filter( list(encounters) )
+					for enc in encounters:
+						analysis.add( enc )
+		elif db is not None:
+			for path in paths:
+				if seen is not None and not seen.new_file(path):
+					progress.message( "\n*** Already seen: %s\n" % path )
+					continue
+				# The database has its own way of skipping what it has.
+				encounters = parse_files( [path], args.jobs, cache, progress, profile )
+				with timed( profile, "encounter_db.add", len(encounters) ):
+					written, skipped = db.add( path, encounters )
+				progress.message( "*** %s: %d encounters saved in %s, %d already there\n" % (
+					path, written, args.db, skipped ) )
+				if seen is not None:
+					with timed( profile, "seen.filter", len(encounters) ):
+						encounters = seen.filter( encounters )
+				with timed( profile, "analyzer.add", len(encounters) ):
+					for enc in encounters:
+						analysis.add( enc )
+			db.close()
+		elif cache is None and ingest is not None:
+			with timed( profile, "ingest", len(paths) ):
+				ingest( paths, analysis, args.jobs, progress, profile, seen=seen )
+		else:
+			encounters = parse_files( paths, args.jobs, cache, progress, profile, seen )
+			with timed( profile, "analyzer.add", len(encounters) ):
+				for enc in encounters:
+					analysis.add( enc )
+		if seen is not None:
+			if seen.skipped:
+				progress.message( "*** Skipped %d encounters already seen in other logs\n" % seen.skipped )
+			seen.save()
+	with timed( profile, "analyzer.monsters" ):
+		monsters = analysis.monsters()
+	rep = report( logpath )
+	rep.write( templates.head )
+	rep.log( "kol_parse |", time.ctime(), tag="h3" )
+	write_report( rep, monsters, analysis, profile )
+	rep.close()
+	if analysis.errors:
+		progress.message( "\nErrors:" )
+		for error in analysis.errors:
+			progress.message( error )
+	if args.partial:
+		save_partial( analysis, paths[0][:fn_start] + "kol_parse_" + fn + ".partial.json" )
+	if profile is not None:
+		profile.save( paths[0][:fn_start] + "kol_parse_" + fn + ".profile.json" )
+	try:
+		os.startfile( logpath )
+	except AttributeError:
+		# os.startfile only exists on Windows
+		pass
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,875 @@
+'''
+Work out per-monster statistics from parsed encounters.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import math
+import array
+import bisect
+import itertools
+import collections
+
+from .parser import toolbox, metadata_class
+from .symbols import symbols
+from .groups import default_rules
+
+# numpy is optional, and slow to import, so it is imported by load_numpy()
+# the first time there is something to crunch.
+numpy = None
+tried_numpy = False
+
+#Classes
+
+class monster(object):
+	'''Statistics for one monster.  Instead of keeping every encounter, the
+	encounters are stored as columns.  itemrates has a row per encounter: its
+	own item multiplier, or NaN if it didn't log one.  stats, meatdrops and
+	meatmults (the meat multiplier at the time) have a row per won encounter.
+	gotjump and gotjumped hold (initiative, mainstat, ml) triples, flattened.
+	Items found and stolen are kept in itemindex, which maps each item id to
+	a bucket of rows and the item's status (dropped, stolen or unknown) in
+	each one.
+
+	crunch() works out the sorted stats and meats, their averages, and the
+	initiative guesses from the columns.  crunch_monsters() does the same
+	for many monsters at once.  Every method that adds data bumps generation,
+	and the crunched results are reused until the next change.  crunches
+	counts how many times the work was actually done.'''
+	__slots__ = (
+		"name", "id", "encountered", "itemrates",
+		"gotjump", "gotjumped", "jump_inits", "jumped_inits", "initguess",
+		"defeated", "meatdrops", "meatmults", "meats", "meat", "itemdict",
+		"items", "itemindex", "stats", "stat", "level", "generation",
+		"crunched", "crunches" )
+	dropped = 0
+	stolen = 1
+	unknown = 2
+	def __init__(self, name, id=None):
+		self.name = str(name)
+		self.id = id
+		self.encountered = 0
+		self.itemrates = array.array("d")
+		self.gotjump = array.array("l")
+		self.gotjumped = array.array("l")
+		self.jump_inits = []
+		self.jumped_inits = []
+		self.initguess = [None, None, None]
+		self.defeated = 0
+		self.meatdrops = array.array("l")
+		self.meatmults = array.array("d")
+		self.meats = array.array("d")
+		self.meat = 0.0
+		self.itemdict = {}
+		self.items = []
+		self.stats = array.array("d")
+		self.stat = 0.0
+		self.level = 0
+		self.generation = 0
+		self.crunched = None
+		self.crunches = 0
+		self.itemindex = {}
+	def __str__(self):
+		return "Monster: " + self.name
+	def __gt__(self, other):
+		return self.name > other.name
+	def __lt__(self, other):
+		return self.name < other.name
+	def addrow(self, enc, initiative):
+		'''Add a row for an encounter and return its row number.'''
+		row = self.encountered
+		self.encountered += 1
+		self.generation += 1
+		if not enc.metadata or enc.metadata.item is None:
+			self.itemrates.append( float("nan") )
+		else:
+			self.itemrates.append( enc.metadata.item )
+		if enc.jump:
+			self.gotjump.extend( initiative )
+		else:
+			self.gotjumped.extend( initiative )
+		return row
+	def adddrops(self, row, itemids, stolenids):
+		'''Add a row's found and stolen items to the item index.'''
+		stolenids = set(stolenids)
+		itemrate = self.itemrates[row]
+		for itemid in stolenids:
+			self.indexdrop( itemid, row, monster.stolen )
+		for itemid in set(itemids) - stolenids:
+			if itemrate != itemrate:
+				self.indexdrop( itemid, row, monster.unknown )
+			else:
+				self.indexdrop( itemid, row, monster.dropped )
+	def indexdrop(self, itemid, row, status):
+		bucket = self.itemindex.get(itemid)
+		if bucket is None:
+			bucket = self.itemindex[itemid] = ( array.array("l"), array.array("B") )
+		bucket[0].append( row )
+		bucket[1].append( status )
+	def statgain(self, enc, metadata):
+		'''Return the stats an encounter gave, without the player's bonuses.'''
+		multipliers = [1.0, 1.0, 1.0]
+		if metadata.mainstatnum in toolbox.statnums:
+			# Assume a moon sign that gives +10% to your mainstat
+			multipliers[metadata.mainstatnum] += 0.1
+		if metadata.statdaynum in toolbox.statnums and enc.num > 1000:
+			multipliers[metadata.statdaynum] += 0.25
+		return (
+			enc.stats[0] / multipliers[0] +
+			enc.stats[1] / multipliers[1] +
+			enc.stats[2] / multipliers[2] -
+			metadata.stat )
+	def addstats(self, enc, metadata):
+		self.stats.append( self.statgain(enc, metadata) )
+		self.generation += 1
+	def addmeat(self, meat, mult):
+		self.meatdrops.append( meat )
+		self.meatmults.append( mult )
+		self.generation += 1
+	def fresh(self):
+		'''Return True if nothing has changed since the last crunch.'''
+		return self.crunched == self.generation
+	def crunch(self):
+		if self.fresh():
+			return
+		self.crunched = self.generation
+		self.crunches += 1
+		if self.stats:
+			self.stats = array.array( "d", sorted(self.stats) )
+			self.stat = math.fsum(self.stats) / len(self.stats)
+			self.level = int( self.stat * 4 )
+		if self.meatdrops:
+			self.meats = array.array( "d", sorted(
+				[ meat / mult for meat, mult in zip(self.meatdrops, self.meatmults) ] ) )
+			self.meat = math.fsum(self.meats) / len(self.meats)
+		self.jump_inits = []
+		self.jumped_inits = []
+		if self.gotjump:
+			self.jump_inits = [
+				initiative + max( mainstat - self.level - ml, 0 )
+				for initiative, mainstat, ml in triples(self.gotjump) ]
+			self.initguess[2] = min(self.jump_inits) + 99
+		else:
+			self.initguess[2] = None
+		if self.gotjumped:
+			self.jumped_inits = [
+				initiative + max( mainstat - self.level - ml, 0 )
+				for initiative, mainstat, ml in triples(self.gotjumped) ]
+			self.initguess[1] = max(self.jumped_inits) + 1
+		else:
+			self.initguess[1] = None
+		meaningful_jumps = []
+		meaningful_jumpeds = []
+		if self.jump_inits and self.jumped_inits:
+			meaningful_jump_init = max(self.jumped_inits)
+			meaningful_jumped_init = min(self.jump_inits)
+			meaningful_jumps = [i for i in self.jump_inits if i <= meaningful_jump_init]
+			meaningful_jumpeds = [i+100 for i in self.jumped_inits if i <= meaningful_jumped_init]
+		if meaningful_jumps and self.jumped_inits:
+			total = float( sum(meaningful_jumps) + sum(meaningful_jumpeds) )
+			n = len(meaningful_jumps) + len(meaningful_jumpeds)
+			self.initguess[0] = int( total / n + 0.5 )
+		else:
+			self.initguess[0] = None
+	def details(self):
+		self.crunch()
+		return self.detailtext( self.stats, self.meats, self.jump_inits, self.jumped_inits )
+	def detailtext(self, stats, meats, jump_inits, jumped_inits):
+		st = ""
+		if stats:
+			st += "\n Stats (avg %.1f):" % self.stat
+			st += '\n' + ';'.join( ["%.2f" % stat for stat in stats] )
+		if meats:
+			st += "\n Meat (avg %.1f):" % self.meat
+			st += '\n' + ';'.join( ["%.2f" % meat for meat in meats] )
+		if jump_inits:
+			st += "\n Got jump:"
+			st += '\n' + ';'.join( ["%d" % i for i in jump_inits] )
+		if jumped_inits:
+			st += "\n Got jumped:"
+			st += '\n' + ';'.join( ["%d" % i for i in jumped_inits] )
+		st = "<div>" + st.strip() + "</div>"
+		st = "<h4 onclick='toggle_invis(this.nextSibling)'>%s (%d encountered, %d defeated)</h4>" % (
+			self.name, self.encountered, self.defeated ) + st
+		return st
+	def rowcounts(self):
+		'''Return a dict of how many rows there are at each item multiplier,
+		and how many rows didn't log one.'''
+		rows_at = {}
+		unknown_rows = 0
+		for itemrate in self.itemrates:
+			if itemrate != itemrate:
+				# NaN: this encounter didn't log its item drop rate
+				unknown_rows += 1
+			else:
+				rows_at[itemrate] = rows_at.get(itemrate, 0) + 1
+		return rows_at, unknown_rows
+	def itemcounts(self, itemid):
+		'''Return dicts of how many rows an item dropped in and was stolen in
+		at each item multiplier.  Stolen rows without one are under None.'''
+		dropped_at = {}
+		stolen_at = {}
+		rows, statuses = self.itemindex.get( itemid, ((), ()) )
+		for row, status in zip(rows, statuses):
+			itemrate = self.itemrates[row]
+			if status == monster.dropped:
+				dropped_at[itemrate] = dropped_at.get(itemrate, 0) + 1
+			elif status == monster.stolen:
+				if itemrate != itemrate:
+					itemrate = None
+				stolen_at[itemrate] = stolen_at.get(itemrate, 0) + 1
+		return dropped_at, stolen_at
+	def counts(self):
+		'''Return how many times each distinct value was seen, with the
+		monster's items, as a dict that can be saved as JSON and added to
+		another analyzer with analyzer.merge().'''
+		rows_at, unknown_rows = self.rowcounts()
+		rows = countpairs( rows_at )
+		if unknown_rows:
+			rows.append( [None, unknown_rows] )
+		items = []
+		for thing in sorted( self.itemdict.values() ):
+			dropped_at, stolen_at = self.itemcounts( thing.id )
+			items.append( {
+				"name": thing.name,
+				"found": thing.found,
+				"stolen": thing.stolen,
+				"misc": thing.misc,
+				"prevented": thing.prevented,
+				"ratesum": thing.ratesum,
+				"dropped_at": countpairs( dropped_at ),
+				"stolen_at": countpairs( stolen_at ),
+			} )
+		return {
+			"name": self.name,
+			"encountered": self.encountered,
+			"defeated": self.defeated,
+			"stats": countpairs( self.statcounts() ),
+			"meats": countpairs( self.meatcounts() ),
+			"gotjump": countpairs( self.initcounts(self.gotjump) ),
+			"gotjumped": countpairs( self.initcounts(self.gotjumped) ),
+			"rows_at": rows,
+			"items": items,
+		}
+	def statcounts(self):
+		return collections.Counter( self.stats )
+	def meatcounts(self):
+		return collections.Counter(
+			[ meat / mult for meat, mult in zip(self.meatdrops, self.meatmults) ] )
+	def initcounts(self, flat):
+		return collections.Counter( triples(flat) )
+	def itemdetails(self):
+		# Every row that didn't drop or lose an item to stealing is a
+		# non-drop, so count the rows at each item multiplier once and take
+		# away the ones the item dropped or was stolen in.
+		rows_at, unknown_rows = self.rowcounts()
+		st = ""
+		for thing in self.items:
+			dropped_at, stolen_at = self.itemcounts( thing.id )
+			notdropped_at = dict(rows_at)
+			for itemrate in dropped_at:
+				notdropped_at[itemrate] -= dropped_at[itemrate]
+			stolen = 0
+			unknown = unknown_rows
+			for itemrate in stolen_at:
+				stolen += stolen_at[itemrate]
+				if itemrate is None:
+					unknown -= stolen_at[itemrate]
+				else:
+					notdropped_at[itemrate] -= stolen_at[itemrate]
+			dropped = expand( dropped_at )
+			notdropped = []
+			for itemrate in sorted( notdropped_at, reverse=True ):
+				notdropped.extend( [itemrate] * notdropped_at[itemrate] )
+			if dropped:
+				st += "\n(%s) %d drops: " % ( thing.name, len(dropped) )
+				st += " ".join( ["%.2f" % rate for rate in dropped] )
+			if notdropped:
+				st += "\n(%s) %d non-drops: " % ( thing.name, len(notdropped) )
+				st += " ".join( ["%.2f" % rate for rate in notdropped] )
+			if stolen:
+				st += "\n(%s) %d stolen" % ( thing.name, stolen )
+			if unknown:
+				st += "\n(%s) %d encounter(s) missing item drop rate data" % ( thing.name, unknown )
+		st = "<div>" + st.strip() + "</div>"
+		st = "<h4 onclick='toggle_invis(this.nextSibling)'>%s (%d encountered, %d defeated)</h4>" % (
+			self.name, self.encountered, self.defeated ) + st
+		return st
+	def overview(self):
+		self.crunch()
+		st = "level: %d" % self.level
+		if self.stats:
+			st += "\n stats: %.1f [%.1f .. %.1f]" % (
+				self.stat, min(self.stats), max(self.stats) )
+		if self.initguess[0] is not None:
+			st += "\n init: %d [%d .. %d]" % tuple(self.initguess)
+		elif self.initguess[1] is not None and self.initguess[2] is not None:
+			st += "\n init: ? [%d .. %d]" % ( self.initguess[1], self.initguess[2] )
+		elif self.initguess[1] is not None:
+			st += "\n init: ? [%d .. ?]" % self.initguess[1]
+		elif self.initguess[2] is not None:
+			st += "\n init: ? [? .. %d]" % self.initguess[2]
+		if sum(self.meats):
+			st += "\n meat: %.1f [%.1f .. %.1f]" % (
+				self.meat, min(self.meats), max(self.meats) )
+		else:
+			st += "\n meat: None"
+		for thing in self.items:
+			st += "\n" + thing.overview()
+		st = "<div class='uninvis'>" + st.strip() + "</div>"
+		st = "<h4 onclick='toggle_invis(this.nextSibling)'>%s (%d encountered, %d defeated)</h4>" % (
+			self.name, self.encountered, self.defeated ) + st
+		return st
+
+class monster_summary(monster):
+	'''A monster that keeps only counts of each distinct value instead of a
+	row per encounter, so its memory doesn't grow with the number of
+	encounters.  stats and meats are Counters of values; gotjump and
+	gotjumped count (initiative, mainstat, ml) triples; rows_at counts the
+	rows at each item multiplier (None if the encounter didn't log one), and
+	itemdrops maps each item id to Counters of the rows it dropped and was
+	stolen in at each item multiplier.
+
+	The numbers come out the same as monster's.  The only difference is that
+	details() lists the initiatives in order instead of as they happened.'''
+	__slots__ = ( "rows_at", "itemdrops" )
+	def __init__(self, name, id=None):
+		self.name = str(name)
+		self.id = id
+		self.encountered = 0
+		self.rows_at = collections.Counter()
+		self.gotjump = collections.Counter()
+		self.gotjumped = collections.Counter()
+		self.jump_inits = collections.Counter()
+		self.jumped_inits = collections.Counter()
+		self.initguess = [None, None, None]
+		self.defeated = 0
+		self.meats = collections.Counter()
+		self.meat = 0.0
+		self.itemdict = {}
+		self.items = []
+		self.itemdrops = {}
+		self.stats = collections.Counter()
+		self.stat = 0.0
+		self.level = 0
+		self.generation = 0
+		self.crunched = None
+		self.crunches = 0
+	def addrow(self, enc, initiative):
+		'''Count an encounter.  Instead of a row number, return its item
+		multiplier for adddrops().'''
+		self.encountered += 1
+		self.generation += 1
+		if not enc.metadata or enc.metadata.item is None:
+			itemrate = None
+		else:
+			itemrate = enc.metadata.item
+		self.rows_at[itemrate] += 1
+		if enc.jump:
+			self.gotjump[initiative] += 1
+		else:
+			self.gotjumped[initiative] += 1
+		return itemrate
+	def adddrops(self, itemrate, itemids, stolenids):
+		stolenids = set(stolenids)
+		for itemid in stolenids:
+			self.drops(itemid)[1][itemrate] += 1
+		for itemid in set(itemids) - stolenids:
+			self.drops(itemid)[0][itemrate] += 1
+	def drops(self, itemid):
+		counts = self.itemdrops.get(itemid)
+		if counts is None:
+			counts = self.itemdrops[itemid] = ( collections.Counter(), collections.Counter() )
+		return counts
+	def addstats(self, enc, metadata):
+		self.stats[ self.statgain(enc, metadata) ] += 1
+		self.generation += 1
+	def addmeat(self, meat, mult):
+		self.meats[ meat / mult ] += 1
+		self.generation += 1
+	def crunch(self):
+		if self.fresh():
+			return
+		self.crunched = self.generation
+		self.crunches += 1
+		if self.stats:
+			self.stat = math.fsum( expand(self.stats) ) / sum( self.stats.values() )
+			self.level = int( self.stat * 4 )
+		if self.meats:
+			self.meat = math.fsum( expand(self.meats) ) / sum( self.meats.values() )
+		self.jump_inits = collections.Counter()
+		for (initiative, mainstat, ml), n in self.gotjump.items():
+			self.jump_inits[ initiative + max( mainstat - self.level - ml, 0 ) ] += n
+		self.jumped_inits = collections.Counter()
+		for (initiative, mainstat, ml), n in self.gotjumped.items():
+			self.jumped_inits[ initiative + max( mainstat - self.level - ml, 0 ) ] += n
+		self.initguess[2] = min(self.jump_inits) + 99 if self.jump_inits else None
+		self.initguess[1] = max(self.jumped_inits) + 1 if self.jumped_inits else None
+		self.initguess[0] = None
+		if self.jump_inits and self.jumped_inits:
+			meaningful_jump_init = max(self.jumped_inits)
+			meaningful_jumped_init = min(self.jump_inits)
+			total = 0
+			n = 0
+			for i, count in self.jump_inits.items():
+				if i <= meaningful_jump_init:
+					total += i * count
+					n += count
+			if n:
+				for i, count in self.jumped_inits.items():
+					if i <= meaningful_jumped_init:
+						total += (i + 100) * count
+						n += count
+				self.initguess[0] = int( float(total) / n + 0.5 )
+	def details(self):
+		self.crunch()
+		return self.detailtext(
+			expand(self.stats), expand(self.meats),
+			expand(self.jump_inits), expand(self.jumped_inits) )
+	def statcounts(self):
+		return self.stats
+	def meatcounts(self):
+		return self.meats
+	def initcounts(self, counts):
+		return counts
+	def addcounts(self, counts):
+		'''Add the counts from another monster's counts(), except for its
+		items, which analyzer.merge() adds.'''
+		self.encountered += counts["encountered"]
+		self.defeated += counts["defeated"]
+		self.generation += 1
+		for value, n in counts["stats"]:
+			self.stats[value] += n
+		for value, n in counts["meats"]:
+			self.meats[value] += n
+		for initiative, n in counts["gotjump"]:
+			self.gotjump[ tuple(initiative) ] += n
+		for initiative, n in counts["gotjumped"]:
+			self.gotjumped[ tuple(initiative) ] += n
+		for itemrate, n in counts["rows_at"]:
+			self.rows_at[itemrate] += n
+	def rowcounts(self):
+		rows_at = dict( [ (itemrate, n) for itemrate, n in self.rows_at.items() if itemrate is not None ] )
+		return rows_at, self.rows_at.get(None, 0)
+	def itemcounts(self, itemid):
+		dropped_at, stolen_at = self.itemdrops.get( itemid, ({}, {}) )
+		# Drops without an item multiplier have an unknown status.
+		dropped_at = dict( [ (itemrate, n) for itemrate, n in dropped_at.items() if itemrate is not None ] )
+		return dropped_at, stolen_at
+
+class item(object):
+	__slots__ = (
+		"name", "id", "found", "stolen", "misc", "prevented", "ratesum", "rate" )
+	def __init__(self, name="", id=None):
+		self.name = name
+		self.id = id
+		self.found = 0
+		self.stolen = 0 # todo: count rave-stolen items
+		self.misc = 0
+		self.prevented = 0 # item stolen and combat won
+		self.ratesum = 0.0 # sum of 1/item multiplier over the drops
+		self.rate = 0.0
+	def __str__(self):
+		return self.name
+	def __gt__(self, other):
+		return self.name > other.name
+	def __lt__(self, other):
+		return self.name < other.name
+	def overview(self):
+		if self.rate == 1:
+			st = "100%% %s" % self.name
+		elif self.rate is None:
+			st = " 0%% %s" % self.name
+		else:
+			st = "%.1f%% %s" % (self.rate*100, self.name)
+		st += " (%d drop%s" % (self.found, "s" if self.found != 1 else "")
+		if self.stolen:
+			st += ", %d stolen" % self.stolen
+		if self.misc:
+			st += ", %d other" % self.misc
+		st += ")"
+		return st
+
+class snapshots(object):
+	'''The metadata in effect as encounters are added, kept as snapshots that
+	are never changed once made.  An encounter that logged nothing shares the
+	current snapshot, and a change makes a new one, so an encounter only needs
+	the snapshot's id.  metadata is the current snapshot, id its id and
+	initiative its metadata_class.initiative().
+
+	If keep is set, every distinct snapshot is kept and interned, so the same
+	modifiers get the same id again, self[id] is the snapshot with that id and
+	at() says which one was in effect for an adventure.  Only their key()s are
+	kept, which take much less memory than metadata_class objects.  Otherwise
+	ids just count the changes, and memory use doesn't grow with the log.'''
+	def __init__(self, keep=True):
+		self.keep = keep
+		self.ids = {}
+		self.keys = []
+		# The adventures where the snapshot changed, and the new ids
+		self.starts = array.array("l")
+		self.changes = array.array("l")
+		self.versions = 0
+		self.metadata = None
+		self.key = None
+		self.id = None
+		self.initiative = None
+		self.set( initial_metadata() )
+	def __getitem__(self, id):
+		return metadata_class.from_record( self.keys[id] )
+	def __len__(self):
+		return len(self.keys)
+	def set(self, metadata):
+		'''Make metadata the current snapshot, unless it is the same as the
+		current one.  Nothing may change it afterwards.  Return its id.'''
+		key = metadata.key()
+		if key == self.key:
+			return self.id
+		if self.keep:
+			id = self.ids.get(key)
+			if id is None:
+				id = self.ids[key] = len(self.keys)
+				self.keys.append( key )
+		else:
+			id = self.versions
+			self.versions += 1
+		self.metadata = metadata
+		self.key = key
+		self.id = id
+		self.initiative = metadata.initiative()
+		return id
+	def advance(self, changes, num=0):
+		'''Apply an encounter's metadata, which is None if it logged nothing,
+		and return the id of the snapshot in effect for adventure num.'''
+		if changes is not None or any( self.metadata.statpoints ):
+			metadata = self.metadata.copy()
+			metadata.import_from( changes )
+			self.set( metadata )
+		if num and self.keep:
+			if self.starts and num < self.starts[-1]:
+				# Adventure numbers start again after an ascension, so only
+				# the latest run of them can be looked up.
+				del self.starts[:]
+				del self.changes[:]
+			if not self.changes or self.changes[-1] != self.id:
+				self.starts.append( num )
+				self.changes.append( self.id )
+		return self.id
+	def at(self, num):
+		'''Return the snapshot in effect for adventure num, or None if it came
+		before the first one added.'''
+		i = bisect.bisect_right( self.starts, num ) - 1
+		if i < 0:
+			return None
+		return self[ self.changes[i] ]
+
+class analyzer(object):
+	'''Collects per-monster statistics from encounters.  Encounters must be
+	added in order, but they can be added a few at a time, e.g. as a log
+	grows.  trace is a list of what happened to each encounter for the
+	report, or None to not keep one.  Unless details is set, the monsters are
+	monster_summary objects, which only count the distinct values, so with
+	neither a trace nor details memory use doesn't grow with the log.
+
+	Encounters with a monster that is in a group (see group_rules) are also
+	added to a monster named after the group, and items in a group are also
+	counted as the group's item.  groups defaults to the groups in
+	groups.json.
+
+	The metadata in effect is kept in snapshots, which keeps every distinct
+	snapshot when there are details.'''
+	def __init__(self, trace=True, details=True, groups=None):
+		self.details = details
+		self.groups = groups if groups is not None else default_rules()
+		self.monstersdict = {}
+		self.monsternames = symbols()
+		self.itemnames = symbols()
+		self.snapshots = snapshots( keep=details )
+		self.combats = 0
+		self.trace = [] if trace else None
+		self.errors = []
+	def error(self, message):
+		'''Note a problem with the log.  Nothing is printed; the errors are
+		listed at the end of the report, each one once.'''
+		if message not in self.errors:
+			self.errors.append( message )
+		if self.trace is not None:
+			self.trace.append( message )
+	def add(self, enc):
+		enc.snapshot = self.snapshots.advance( enc.metadata, enc.num )
+		metadata = self.snapshots.metadata
+		if enc.iscombat:
+			self.combats += 1
+			if self.trace is not None:
+				self.trace.append( "Analyzing %s" % enc )
+		else:
+			if enc.location and self.trace is not None:
+				self.trace.append( "Skipping %s" % enc )
+			return
+		if enc.won and metadata.mainstatnum not in toolbox.statnums:
+			self.error( "*** Invalid class: %s" % str(metadata.charclass) )
+			self.error( "*** (Is \"Session log records your player's state on login\" turned on?)" )
+		initiative = self.snapshots.initiative
+		inverse_itemrate = 1 / (
+				metadata.item +
+				( 0.2 if "Disco Concentration" in enc.effects else 0 ) +
+				( 0.3 if "Rave Concentration" in enc.effects else 0 )
+		)
+		itemids = self.itemids( enc.items )
+		stolenids = self.itemids( enc.stolenitems )
+		miscids = self.itemids( enc.miscitems )
+		self.count( self.monster( enc.monstername ),
+			enc, metadata, initiative, inverse_itemrate, itemids, stolenids, miscids )
+		for group in self.groups.monster_groups( enc.monstername ):
+			self.count( self.monster(group),
+				enc, metadata, initiative, inverse_itemrate, itemids, stolenids, miscids )
+	def itemids(self, names):
+		'''Return the ids of the items in names, followed by the ids of the
+		groups they are in.'''
+		ids = [ self.itemnames.id(name) for name in names ]
+		for name in names:
+			for group in self.groups.item_groups(name):
+				ids.append( self.itemnames.id(group) )
+		return ids
+	def count(self, mon, enc, metadata, initiative, inverse_itemrate, itemids, stolenids, miscids):
+		'''Add an encounter to one monster.'''
+		row = mon.addrow( enc, initiative )
+		# todo: damage stuff
+		if enc.won:
+			mon.defeated += 1
+			mon.addstats( enc, metadata )
+			mon.addmeat( enc.meat, metadata.meat )
+		mon.adddrops( row, itemids, stolenids )
+		for itemid in itemids:
+			thing = self.item( mon, itemid )
+			thing.found += 1
+			thing.ratesum += inverse_itemrate
+		for itemid in stolenids:
+			thing = self.item( mon, itemid )
+			thing.stolen += 1
+			if enc.won:
+				thing.prevented += 1
+		for itemid in miscids:
+			self.item( mon, itemid ).misc += 1
+	def monster(self, name):
+		'''Return the monster object for name, creating it if needed.'''
+		monsterid = self.monsternames.id( name )
+		mon = self.monstersdict.get(monsterid)
+		if mon is None:
+			if self.details:
+				mon = monster( name, monsterid )
+			else:
+				mon = monster_summary( name, monsterid )
+			self.monstersdict[monsterid] = mon
+		return mon
+	def partial(self):
+		'''Return everything counted so far as a dict that can be saved as
+		JSON, and added to another analyzer with merge().  The trace is left
+		out.'''
+		return {
+			"combats": self.combats,
+			"errors": list( self.errors ),
+			"monsters": [ mon.counts() for mon in sorted( self.monstersdict.values() ) ],
+		}
+	def merge(self, partial):
+		'''Add a partial() from another analyzer.  Only an analyzer made with
+		details=False can do this, since a partial has no rows to add.
+		Merging is associative: partials can be merged in any grouping, and
+		merged analyzers' partials merged again, with the same result.'''
+		if self.details:
+			raise ValueError( "only an analyzer without details can merge partials" )
+		self.combats += partial["combats"]
+		for error in partial["errors"]:
+			if error not in self.errors:
+				self.errors.append( error )
+		for counts in partial["monsters"]:
+			mon = self.monster( counts["name"] )
+			mon.addcounts( counts )
+			for thing_counts in counts["items"]:
+				itemid = self.itemnames.id( thing_counts["name"] )
+				thing = self.item( mon, itemid )
+				thing.found += thing_counts["found"]
+				thing.stolen += thing_counts["stolen"]
+				thing.misc += thing_counts["misc"]
+				thing.prevented += thing_counts["prevented"]
+				thing.ratesum += thing_counts["ratesum"]
+				dropped_at, stolen_at = mon.drops( itemid )
+				for itemrate, n in thing_counts["dropped_at"]:
+					dropped_at[itemrate] += n
+				for itemrate, n in thing_counts["stolen_at"]:
+					stolen_at[itemrate] += n
+	def item(self, mon, itemid):
+		'''Return mon's item object for itemid, creating it if needed.'''
+		thing = mon.itemdict.get(itemid)
+		if thing is None:
+			thing = mon.itemdict[itemid] = item( self.itemnames[itemid], itemid )
+		return thing
+	def monsters(self):
+		'''Return a sorted list of the monsters seen so far, crunched and with
+		item drop rates worked out.'''
+		monsters = list( self.monstersdict.values() )
+		monsters.sort()
+		for mon in monsters:
+			mon.items = list( mon.itemdict.values() )
+			mon.items.sort()
+			for thing in mon.items:
+				d = mon.defeated - thing.prevented
+				if d > 0:
+					if thing.found == d:
+						thing.rate = 1.0
+					else:
+						thing.rate = thing.ratesum / d
+				else:
+					thing.rate = None
+		crunch_monsters( monsters )
+		return monsters
+
+#Functions
+
+def load_numpy():
+	'''Import numpy if that hasn't been tried yet.  Return it, or None if it
+	isn't installed.'''
+	global numpy, tried_numpy
+	if not tried_numpy:
+		tried_numpy = True
+		try:
+			import numpy
+		except ImportError:
+			numpy = None
+	return numpy
+
+def initial_metadata():
+	'''Return the metadata assumed before a log says otherwise.'''
+	metadata = metadata_class()
+	metadata.ml = 0
+	metadata.combat = 0
+	metadata.init = 0
+	metadata.stat = 0.0
+	metadata.meat = 1.0
+	metadata.item = 1.0
+	return metadata
+
+def expand(counts):
+	'''Return the sorted list of values counted in a dict of counts.'''
+	return list( itertools.chain.from_iterable(
+		[ itertools.repeat( value, counts[value] ) for value in sorted(counts) ] ) )
+
+def countpairs(counts):
+	'''Return a dict of counts as a sorted list of [value, count] pairs,
+	which can be saved as JSON.  None sorts last.'''
+	return [ [value, counts[value]]
+		for value in sorted( counts, key=lambda value: (value is None, value) ) ]
+
+def triples(flat):
+	'''Iterate over a flat sequence three items at a time.'''
+	it = iter(flat)
+	return zip( it, it, it )
+
+def crunch_monsters(monsters):
+	'''Call crunch() on every monster.  If numpy is available, all of the
+	monsters are crunched at once with array operations instead, which gives
+	the same numbers.  Monsters that haven't changed since their last crunch
+	are skipped.'''
+	np = load_numpy()
+	if np is None:
+		for mon in monsters:
+			mon.crunch()
+		return
+	# A monster_summary has no columns, and not much to crunch anyway.
+	for mon in monsters:
+		if isinstance( mon, monster_summary ):
+			mon.crunch()
+	monsters = [ mon for mon in monsters if not mon.fresh() ]
+	count = len(monsters)
+	def column(name, width=1):
+		'''Join one column of every monster into a numpy array.  Return the
+		array, the monster number of each row, and where each monster's rows
+		start and end.'''
+		arrays = [ getattr(mon, name) for mon in monsters ]
+		lengths = np.array( [len(a) // width for a in arrays], dtype=np.intp )
+		ends = np.cumsum(lengths)
+		starts = ends - lengths
+		values = [ np.frombuffer(a, dtype=a.typecode) for a in arrays if len(a) ]
+		if values:
+			values = np.concatenate(values)
+		else:
+			values = np.zeros( 0, dtype=arrays[0].typecode if arrays else "d" )
+		if width > 1:
+			values = values.reshape( -1, width )
+		return values, np.repeat( np.arange(count), lengths ), starts, ends
+	def segment_sort(values, starts, ends):
+		for start, end in zip(starts, ends):
+			values[start:end].sort()
+		return values
+	def segment_sum(values, segs):
+		# Only for whole numbers, which bincount adds up exactly.
+		return np.bincount( segs, weights=values, minlength=count )
+	def segment_fsum(values, starts, ends):
+		# math.fsum() rounds only once, so the sums are the same as crunch()'s
+		# whatever order the values are in.  sum() of floats differs between
+		# pythons, and bincount's differs from both.
+		return np.array( [ math.fsum( values[start:end].tolist() )
+			for start, end in zip(starts, ends) ], dtype=np.float64 )
+	# stats and level
+	stats, segs, stat_starts, stat_ends = column("stats")
+	stats = segment_sort( stats, stat_starts, stat_ends )
+	nstats = stat_ends - stat_starts
+	has_stats = nstats > 0
+	means = segment_fsum( stats, stat_starts, stat_ends ) / np.maximum( nstats, 1 )
+	levels = np.array( [mon.level for mon in monsters], dtype=np.int64 )
+	levels[has_stats] = ( means[has_stats] * 4 ).astype(np.int64)
+	# meat
+	meatdrops, segs, meat_starts, meat_ends = column("meatdrops")
+	meatmults, segs, meat_starts, meat_ends = column("meatmults")
+	meats = segment_sort( meatdrops / meatmults, meat_starts, meat_ends )
+	nmeats = meat_ends - meat_starts
+	meatmeans = segment_fsum( meats, meat_starts, meat_ends ) / np.maximum( nmeats, 1 )
+	# initiative
+	def inits(name):
+		triples, segs, starts, ends = column( name, 3 )
+		inits = triples[:, 0] + np.maximum( triples[:, 1] - levels[segs] - triples[:, 2], 0 )
+		has = ends > starts
+		low = np.zeros( count, dtype=inits.dtype )
+		high = np.zeros( count, dtype=inits.dtype )
+		if has.any():
+			low[has] = np.minimum.reduceat( inits, starts[has] )
+			high[has] = np.maximum.reduceat( inits, starts[has] )
+		return inits, segs, starts, ends, has, low, high
+	jump_inits, jump_segs, jump_starts, jump_ends, has_jump, jump_min, jump_max = inits("gotjump")
+	jumped_inits, jumped_segs, jumped_starts, jumped_ends, has_jumped, jumped_min, jumped_max = inits("gotjumped")
+	both = has_jump & has_jumped
+	meaningful = both[jump_segs] & ( jump_inits <= jumped_max[jump_segs] )
+	meaningfuled = both[jumped_segs] & ( jumped_inits <= jump_min[jumped_segs] )
+	nmeaningful = np.bincount( jump_segs[meaningful], minlength=count )
+	total = (
+		segment_sum( jump_inits[meaningful], jump_segs[meaningful] ) +
+		segment_sum( jumped_inits[meaningfuled] + 100, jumped_segs[meaningfuled] ) )
+	n = nmeaningful + np.bincount( jumped_segs[meaningfuled], minlength=count )
+	for i, mon in enumerate(monsters):
+		mon.crunched = mon.generation
+		mon.crunches += 1
+		if has_stats[i]:
+			mon.stats = array.array( "d", stats[ stat_starts[i] : stat_ends[i] ].tobytes() )
+			mon.stat = float( means[i] )
+			mon.level = int( levels[i] )
+		if nmeats[i]:
+			mon.meats = array.array( "d", meats[ meat_starts[i] : meat_ends[i] ].tobytes() )
+			mon.meat = float( meatmeans[i] )
+		mon.jump_inits = jump_inits[ jump_starts[i] : jump_ends[i] ].tolist()
+		mon.jumped_inits = jumped_inits[ jumped_starts[i] : jumped_ends[i] ].tolist()
+		mon.initguess[2] = int( jump_min[i] ) + 99 if has_jump[i] else None
+		mon.initguess[1] = int( jumped_max[i] ) + 1 if has_jumped[i] else None
+		if nmeaningful[i]:
+			mon.initguess[0] = int( float( total[i] ) / int( n[i] ) + 0.5 )
+		else:
+			mon.initguess[0] = None
+
+def analyze(encounters, trace=False, details=True):
+	'''Add encounters, e.g. from parse(), to a new analyzer and return it.
+	Its monsters() are what the report is made of.'''
+	analysis = analyzer( trace, details )
+	for enc in encounters:
+		analysis.add( enc )
+	return analysis
+
+def analyze_monsters(encounters):
+	return analyze( encounters ).monsters()
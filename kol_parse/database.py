@@ -0,0 +1,200 @@
+'''
+Save parsed encounters in an SQLite database, so questions about drop rates or
+initiative can be answered with a query instead of parsing every log again.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import os
+import time
+import binascii
+import sqlite3
+
+from .analysis import snapshots
+from .files import fingerprint
+
+schema = '''
+CREATE TABLE IF NOT EXISTS logs (
+	id INTEGER PRIMARY KEY,
+	name TEXT NOT NULL UNIQUE,
+	path TEXT,
+	encounters INTEGER NOT NULL DEFAULT 0,
+	ingested REAL
+);
+CREATE TABLE IF NOT EXISTS encounters (
+	id INTEGER PRIMARY KEY,
+	log INTEGER NOT NULL REFERENCES logs(id),
+	seq INTEGER NOT NULL,
+	fingerprint TEXT NOT NULL,
+	adventure INTEGER,
+	location TEXT,
+	title TEXT,
+	monster TEXT,
+	iscombat INTEGER,
+	jump INTEGER,
+	won INTEGER,
+	meat INTEGER,
+	mus_gain INTEGER,
+	mys_gain INTEGER,
+	mox_gain INTEGER,
+	-- The metadata in effect, as the analyzer has it: what the log logged
+	-- up to here, on top of what the logs added before it by the same
+	-- encounter_db (one kol_parse run) ended with.  A log added on its own
+	-- starts from initial_metadata().
+	class TEXT,
+	mus INTEGER,
+	mys INTEGER,
+	mox INTEGER,
+	statday TEXT,
+	ml INTEGER,
+	combat INTEGER,
+	init INTEGER,
+	stat REAL,
+	meat_mult REAL,
+	item_mult REAL,
+	UNIQUE (log, seq)
+);
+CREATE TABLE IF NOT EXISTS items (
+	encounter INTEGER NOT NULL REFERENCES encounters(id),
+	item TEXT NOT NULL,
+	how TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS effects (
+	encounter INTEGER NOT NULL REFERENCES encounters(id),
+	effect TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS mondamages (
+	encounter INTEGER NOT NULL REFERENCES encounters(id),
+	round INTEGER NOT NULL,
+	damage INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS encounters_monster ON encounters (monster);
+CREATE INDEX IF NOT EXISTS encounters_location ON encounters (location);
+CREATE INDEX IF NOT EXISTS encounters_adventure ON encounters (adventure);
+CREATE INDEX IF NOT EXISTS encounters_fingerprint ON encounters (fingerprint);
+CREATE INDEX IF NOT EXISTS items_item ON items (item);
+CREATE INDEX IF NOT EXISTS items_encounter ON items (encounter);
+CREATE INDEX IF NOT EXISTS effects_encounter ON effects (encounter);
+CREATE INDEX IF NOT EXISTS mondamages_encounter ON mondamages (encounter);
+'''
+
+#Classes
+
+class encounter_db(object):
+	'''An SQLite database of parsed encounters.  Each encounter is one row of
+	encounters, with the metadata the analyzer would have had at the time
+	(class, stat bases, ml, combat rate, initiative, bonus stats, meat and
+	item multipliers), and its items, effects and round damage are rows of
+	items, effects and mondamages.  Like the analyzer's, the metadata in
+	effect is kept in state from one add() to the next, so logs should be
+	added in order.
+
+	Encounters are keyed by their log's file name and their place in it, so
+	adding a log again only writes the encounters that are new or changed,
+	e.g. after the log has grown.  An encounter that another log already
+	has, e.g. when a weekly log is made by joining daily ones, isn't added
+	again.'''
+	version = 4
+	batch = 10000
+	def __init__(self, path):
+		self.path = path
+		self.state = snapshots( keep=False )
+		self.connection = sqlite3.connect(path)
+		version = self.connection.execute( "PRAGMA user_version" ).fetchone()[0]
+		if version not in ( 0, encounter_db.version ):
+			self.connection.close()
+			raise ValueError( "%s is a version %d database, but this kol_parse uses version %d" % (
+				path, version, encounter_db.version ) )
+		with self.connection:
+			self.connection.executescript( schema )
+			self.connection.execute( "PRAGMA user_version = %d" % encounter_db.version )
+	def close(self):
+		self.connection.close()
+	def query(self, sql, parameters=()):
+		'''Run a query and return the column names and the rows.'''
+		cursor = self.connection.execute( sql, parameters )
+		columns = [ column[0] for column in cursor.description or () ]
+		return columns, cursor.fetchall()
+	def logid(self, name, path):
+		row = self.connection.execute( "SELECT id FROM logs WHERE name = ?", (name,) ).fetchone()
+		if row:
+			return row[0]
+		return self.connection.execute(
+			"INSERT INTO logs (name, path) VALUES (?, ?)", (name, path) ).lastrowid
+	def add(self, path, encounters):
+		'''Add the encounters parsed from the log at path, in order, in one
+		transaction.  Encounters that are already there, from this log or
+		another one, are skipped, changed ones are replaced, and ones that
+		aren't in the log any more are deleted.  Return how many were written
+		and how many skipped.'''
+		name = os.path.basename(path)
+		connection = self.connection
+		with connection:
+			log = self.logid( name, os.path.abspath(path) )
+			known = dict( connection.execute(
+				"SELECT seq, fingerprint FROM encounters WHERE log = ?", (log,) ) )
+			nextid = connection.execute(
+				"SELECT COALESCE(MAX(id), 0) + 1 FROM encounters" ).fetchone()[0]
+			rows = ( [], [], [], [] )
+			stale = []
+			written = 0
+			skipped = 0
+			state = self.state
+			for seq, enc in enumerate(encounters):
+				state.advance( enc.metadata )
+				key = binascii.hexlify( fingerprint( enc.record() ) ).decode("ascii")
+				if known.get(seq) == key:
+					skipped += 1
+					continue
+				if seq in known:
+					stale.append( (log, seq) )
+				elif enc.location and connection.execute(
+						"SELECT 1 FROM encounters WHERE fingerprint = ? AND log != ? LIMIT 1",
+						(key, log) ).fetchone():
+					skipped += 1
+					continue
+				self.addrows( rows, nextid, log, seq, key, enc, state.metadata )
+				nextid += 1
+				written += 1
+				if len(rows[0]) >= encounter_db.batch:
+					self.write( rows, stale )
+					rows = ( [], [], [], [] )
+					stale = []
+			stale.extend( [ (log, seq) for seq in known if seq >= len(encounters) ] )
+			self.write( rows, stale )
+			connection.execute(
+				"UPDATE logs SET path = ?, encounters = ?, ingested = ? WHERE id = ?",
+				( os.path.abspath(path), len(encounters), time.time(), log ) )
+		return written, skipped
+	def addrows(self, rows, id, log, seq, fingerprint, enc, metadata):
+		encounter_rows, item_rows, effect_rows, damage_rows = rows
+		encounter_rows.append( (
+			id, log, seq, fingerprint, enc.num, enc.location, enc.title,
+			enc.monstername, enc.iscombat, enc.jump, enc.won, enc.meat,
+			enc.stats[0], enc.stats[1], enc.stats[2],
+			metadata.charclass, metadata.statbases[0], metadata.statbases[1],
+			metadata.statbases[2], metadata.statday, metadata.ml,
+			metadata.combat, metadata.init, metadata.stat, metadata.meat,
+			metadata.item ) )
+		for how, items in (
+				( "dropped", enc.items ), ( "stolen", enc.stolenitems ),
+				( "misc", enc.miscitems ) ):
+			item_rows.extend( [ (id, item, how) for item in items ] )
+		effect_rows.extend( [ (id, effect) for effect in enc.effects ] )
+		for round in sorted( enc.mondamages ):
+			damage_rows.extend( [ (id, round, damage) for damage in enc.mondamages[round] ] )
+	def write(self, rows, stale):
+		'''Delete the stale (log, seq) encounters and insert a batch of rows.'''
+		connection = self.connection
+		if stale:
+			ids = [
+				connection.execute( "SELECT id FROM encounters WHERE log = ? AND seq = ?", key ).fetchone()
+				for key in stale ]
+			for table in ( "items", "effects", "mondamages" ):
+				connection.executemany( "DELETE FROM %s WHERE encounter = ?" % table, ids )
+			connection.executemany( "DELETE FROM encounters WHERE id = ?", ids )
+		encounter_rows, item_rows, effect_rows, damage_rows = rows
+		connection.executemany(
+			"INSERT INTO encounters VALUES (%s)" % ", ".join( ["?"] * 26 ), encounter_rows )
+		connection.executemany( "INSERT INTO items VALUES (?, ?, ?)", item_rows )
+		connection.executemany( "INSERT INTO effects VALUES (?, ?)", effect_rows )
+		connection.executemany( "INSERT INTO mondamages VALUES (?, ?, ?)", damage_rows )
@@ -0,0 +1,629 @@
+'''
+Read, split, cache and follow log files.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import os
+import io
+import time
+import itertools
+import json
+import hashlib
+import mmap
+import tarfile
+import gzip
+import bz2
+
+try:
+    import lzma
+except ImportError:
+    lzma = None
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+from .parser import searches, lineiter, encounter, parselines, skipped_line
+from .analysis import analyzer
+from .groups import default_rules
+from .progress import progress_meter
+from .profiling import profiler, timed
+
+# zstandard is optional, and imported by load_zstandard() the first time a
+# zstd compressed log turns up.
+zstandard = None
+tried_zstandard = False
+
+#Classes
+
+class encounter_cache(object):
+	'''An on-disk cache of parsed encounters, so unchanged logs don't have to
+	be parsed again.  Entries are keyed by a hash of the log's contents.  The
+	index also remembers the size, mtime and hash of every path it has seen, so
+	a log that hasn't been touched isn't even read.  When the entries grow past
+	max_bytes, the least recently used ones are deleted.'''
+	version = 4
+	def __init__(self, directory, max_bytes=256<<20):
+		self.directory = directory
+		self.max_bytes = max_bytes
+		self.indexpath = os.path.join( directory, "index.json" )
+		self.index = { "version": encounter_cache.version, "paths": {}, "entries": {} }
+		if not os.path.isdir(directory):
+			os.makedirs(directory)
+		try:
+			with io.open( self.indexpath, encoding="utf-8" ) as f:
+				index = json.load(f)
+			if index.get("version") == encounter_cache.version:
+				self.index = index
+		except (IOError, OSError, ValueError):
+			pass
+	def digest(self, path):
+		'''Return the content hash of the file at path, reusing the hash from
+		the index if its size and mtime haven't changed.'''
+		stat = os.stat(path)
+		key = os.path.abspath(path)
+		known = self.index["paths"].get(key)
+		if known and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime:
+			return known["hash"]
+		sha = hashlib.sha1()
+		with io.open(path, "rb") as f:
+			for block in iter( lambda: f.read(1<<20), b"" ):
+				sha.update(block)
+		digest = sha.hexdigest()
+		self.index["paths"][key] = {
+			"size": stat.st_size, "mtime": stat.st_mtime, "hash": digest }
+		return digest
+	def entrypath(self, digest):
+		return os.path.join( self.directory, digest + ".pickle" )
+	def get(self, path):
+		'''Return the cached list of encounters for the log at path, or None.'''
+		digest = self.digest(path)
+		entry = self.index["entries"].get(digest)
+		if not entry:
+			return None
+		try:
+			with io.open( self.entrypath(digest), "rb" ) as f:
+				version, records = pickle.load(f)
+		except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+			version = None
+		if version != encounter_cache.version:
+			del self.index["entries"][digest]
+			return None
+		entry["used"] = time.time()
+		return [ encounter.from_record(record) for record in records ]
+	def put(self, path, encounters):
+		'''Cache the encounters parsed from the log at path.'''
+		digest = self.digest(path)
+		entrypath = self.entrypath(digest)
+		with io.open( entrypath + ".tmp", "wb" ) as f:
+			pickle.dump(
+				( encounter_cache.version, [enc.record() for enc in encounters] ),
+				f, pickle.HIGHEST_PROTOCOL )
+		replace_file( entrypath + ".tmp", entrypath )
+		self.index["entries"][digest] = {
+			"bytes": os.path.getsize(entrypath), "used": time.time() }
+		self.evict()
+	def evict(self):
+		entries = self.index["entries"]
+		total = sum( [entry["bytes"] for entry in entries.values()] )
+		for digest in sorted( entries, key=lambda digest: entries[digest]["used"] ):
+			if total <= self.max_bytes:
+				break
+			total -= entries[digest]["bytes"]
+			del entries[digest]
+			try:
+				os.remove( self.entrypath(digest) )
+			except OSError:
+				pass
+	def save(self):
+		with io.open( self.indexpath + ".tmp", "w", encoding="utf-8" ) as f:
+			f.write( json.dumps(self.index) )
+		replace_file( self.indexpath + ".tmp", self.indexpath )
+
+class seen_encounters(object):
+	'''Fingerprints of the logs and encounters that have been analyzed, so
+	that overlapping logs, like daily logs and a weekly log made by joining
+	them, are only counted once.  A log with the same contents as one already
+	seen is skipped without being parsed, and an encounter from another log
+	is replaced by one that only has its metadata, so the modifiers it logged
+	still count.  Repeats within one log are kept, since they can't be the
+	same encounter read twice.
+
+	If path is given, the fingerprints are loaded from it and save() writes
+	them back, so later runs skip what earlier ones analyzed.'''
+	version = 4
+	def __init__(self, path=None):
+		self.path = path
+		self.files = set()
+		# fingerprint -> the log it came from; 0 for earlier runs
+		self.fingerprints = {}
+		self.sources = 0
+		self.skipped = 0
+		if path is None:
+			return
+		try:
+			with io.open( path, "rb" ) as f:
+				version, files, fingerprints = pickle.load(f)
+		except (IOError, OSError, EOFError, ValueError, pickle.UnpicklingError):
+			return
+		if version == seen_encounters.version:
+			self.files = set(files)
+			self.fingerprints = dict.fromkeys( fingerprints, 0 )
+	def new_file(self, path):
+		'''Return False if a log with the same contents has been seen.'''
+		sha = hashlib.sha1()
+		with io.open( path, "rb" ) as f:
+			for block in iter( lambda: f.read(1<<20), b"" ):
+				sha.update(block)
+		digest = sha.digest()
+		if digest in self.files:
+			return False
+		self.files.add( digest )
+		return True
+	def source(self):
+		'''Return a new number for the log whose encounters come next.'''
+		self.sources += 1
+		return self.sources
+	def new(self, record, source):
+		'''Return True unless the encounter.record() was seen in another log.'''
+		if not record[1]:
+			# No location, so no adventure; only metadata, which is kept.
+			return True
+		key = fingerprint(record)
+		seen = self.fingerprints.get(key)
+		if seen is None:
+			self.fingerprints[key] = source
+			return True
+		if seen == source:
+			return True
+		self.skipped += 1
+		return False
+	def filter(self, encounters):
+		'''Return the encounters of one log, with the ones seen in another log
+		replaced by metadata_only() encounters.'''
+		source = self.source()
+		return [
+			enc if self.new( enc.record(), source ) else metadata_only( enc.metadata )
+			for enc in encounters ]
+	def save(self):
+		if self.path is None:
+			return
+		with io.open( self.path + ".tmp", "wb" ) as f:
+			pickle.dump(
+				( seen_encounters.version, list(self.files), list(self.fingerprints) ),
+				f, pickle.HIGHEST_PROTOCOL )
+		replace_file( self.path + ".tmp", self.path )
+
+#Functions
+
+follow_version = 12
+partial_version = 2
+
+# The first bytes of each kind of compressed file.
+compression_magic = (
+	( b"\x1f\x8b", "gzip" ),
+	( b"\xfd7zXZ\x00", "xz" ),
+	( b"BZh", "bz2" ),
+	( b"\x28\xb5\x2f\xfd", "zstd" ) )
+
+def fingerprint(record):
+	'''Return a short hash of an encounter.record(), which is the same for
+	the same encounter parsed from different logs.  The record has the
+	encounter's linehash, so encounters with the same number, location and
+	results, e.g. from different ascensions, only match if their lines do
+	too.'''
+	return hashlib.sha1( repr(record).encode("utf-8") ).digest()[:8]
+
+def checksum(f, size):
+	'''Return a hash of the 4KB before size in a binary file object, to tell
+	whether a file that is at least size bytes long grew from the one that was
+	size bytes long, or was replaced.'''
+	start = max( size - 4096, 0 )
+	f.seek(start)
+	return hashlib.sha1( f.read( size - start ) ).hexdigest()
+
+def metadata_only(metadata):
+	'''Return an encounter that only carries metadata, to stand in for one
+	that is left out.'''
+	enc = encounter()
+	enc.metadata = metadata
+	return enc
+
+def load_zstandard():
+	'''Import zstandard if that hasn't been tried yet.  Return it, or None if
+	it isn't installed.'''
+	global zstandard, tried_zstandard
+	if not tried_zstandard:
+		tried_zstandard = True
+		try:
+			import zstandard
+		except ImportError:
+			zstandard = None
+	return zstandard
+
+def compression(head):
+	'''Return the kind of compression a file starting with head uses, or
+	None.'''
+	for magic, kind in compression_magic:
+		if head.startswith(magic):
+			return kind
+	return None
+
+def decompress(kind, raw):
+	'''Return a binary file object that reads the decompressed contents of the
+	binary file object raw.'''
+	if kind == "gzip":
+		return gzip.GzipFile( fileobj=raw, mode="rb" )
+	if kind == "bz2":
+		return bz2.BZ2File(raw)
+	if kind == "xz":
+		if lzma is None:
+			raise IOError( "reading xz compressed logs needs the lzma module" )
+		return lzma.LZMAFile(raw)
+	if load_zstandard() is None:
+		raise IOError( "reading zstd compressed logs needs the zstandard module" )
+	return zstandard.ZstdDecompressor().stream_reader(raw)
+
+def read_head(f, size):
+	'''Read size bytes, or up to the end of the file.'''
+	head = b""
+	while len(head) < size:
+		data = f.read( size - len(head) )
+		if not data:
+			break
+		head += data
+	return head
+
+def is_tar(head):
+	return head[257:262] == b"ustar"
+
+def is_plain(path):
+	'''Return whether the file at path is a log that isn't compressed or
+	archived, so it can be split, mapped and followed.'''
+	with io.open( path, "rb" ) as f:
+		head = read_head( f, 262 )
+	return compression(head) is None and not is_tar(head)
+
+def open_logs(path, offset=0):
+	'''Yield (name, file, tell) for each log in the file at path, which may be
+	compressed with gzip, bz2, xz or zstd and may be a tar archive of logs, in
+	the archive's order.  file is a binary file object to read the log from,
+	and tell() returns how many bytes of path have been read so far.  Each
+	log must be read before the next one is asked for.
+
+	Plain logs are memory mapped, and start at offset.'''
+	raw = io.open( path, "rb" )
+	stream = None
+	try:
+		kind = compression( read_head(raw, 6) )
+		raw.seek(0)
+		if kind is None:
+			if os.fstat( raw.fileno() ).st_size:
+				stream = mmap.mmap( raw.fileno(), 0, access=mmap.ACCESS_READ )
+			else:
+				# An empty file can't be mapped.
+				stream = raw
+			head = read_head( stream, 262 )
+			stream.seek(offset)
+			tell = stream.tell
+		else:
+			# Look for a tar header, then start decompressing again.
+			stream = decompress( kind, raw )
+			head = read_head( stream, 262 )
+			stream.close()
+			raw.seek(0)
+			stream = decompress( kind, raw )
+			tell = raw.tell
+		if is_tar(head):
+			tar = tarfile.open( fileobj=stream, mode="r|" )
+			for member in tar:
+				if member.isfile():
+					yield ( path + "/" + member.name, tar.extractfile(member), tell )
+			tar.close()
+		else:
+			yield ( path, stream, tell )
+	finally:
+		if stream is not None and stream is not raw:
+			stream.close()
+		raw.close()
+
+def line_blocks(f, block=1<<20):
+	'''Yield the lines of a binary file object without their line endings, as
+	lists of bytes a block at a time.  Together they are the same lines as
+	f.read().split(b'\n') with any '\r's taken off, but the file is never read
+	all at once, and nothing is decoded.'''
+	rest = b""
+	while True:
+		data = f.read(block)
+		if not data:
+			break
+		lines = ( rest + data ).split(b"\n")
+		rest = lines.pop()
+		if b"\r" in data:
+			lines = [ line.rstrip(b"\r") for line in lines ]
+		yield lines
+	yield [ rest.rstrip(b"\r") ]
+
+def decode_lines(lines):
+	'''Decode a list of undecoded lines.  Most of a log is lines the parser
+	doesn't care about, like mall searches and chat, so a quick regex on the
+	bytes picks out the ones it could care about, and only those and blank
+	lines are decoded.  The rest become skipped_line, so the lines still
+	count the same, and classify() doesn't look at them.  The prefix test
+	runs over the whole list in C and settles most lines, so the regex is
+	only needed for the rest.'''
+	relevant = searches.re_relevant_bytes.search
+	prefixed = map( bytes.startswith, lines, itertools.repeat( searches.relevant_prefixes ) )
+	return [
+		line.decode("utf-8") if not line or known or relevant(line) else skipped_line
+		for line, known in zip( lines, prefixed ) ]
+
+def decode_blocks(blocks, profile=None, batch=4096):
+	'''Yield the lines from line_blocks() one at a time, decoded with
+	decode_lines() batch lines at a time, so that a parse_chunk() that stops
+	partway through a block doesn't decode much it won't use.  If there is a
+	profiler, the time this takes and how many lines were skipped are added
+	to it.'''
+	for block in blocks:
+		for start in range( 0, len(block), batch ):
+			lines = block[ start : start + batch ]
+			if profile is None:
+				decoded = decode_lines(lines)
+			else:
+				with timed( profile, "decode_lines", 1, len(lines) ):
+					decoded = decode_lines(lines)
+				profile.skipped += decoded.count(skipped_line)
+			for line in decoded:
+				yield line
+
+def log_lines(f, profile=None):
+	'''Yield the lines of a log from a binary file object, e.g. one from
+	open_logs(), without their line endings.'''
+	return decode_blocks( line_blocks(f), profile )
+
+def replace_file(src, dst):
+	'''Rename src to dst, replacing dst if it exists.'''
+	try:
+		os.replace(src, dst)
+	except AttributeError:
+		# python 2 has no os.replace
+		if os.path.exists(dst):
+			os.remove(dst)
+		os.rename(src, dst)
+
+def split_log(path, jobs, min_chunk=1<<20):
+	'''Find places to split a log so that several processes can parse it.
+	Every chunk but the first starts on an adventure line.  Return a list of
+	(byte offset, line number) pairs, one for the start of each chunk.
+	Compressed and archived logs can't be split.'''
+	starts = [(0, 0)]
+	if not is_plain(path):
+		return starts
+	step = max( os.path.getsize(path) // jobs, min_chunk )
+	offset = 0
+	with io.open(path, "rb") as f:
+		for n, line in enumerate(f):
+			if ( offset >= starts[-1][0] + step and line.startswith(b"[") and
+					searches.re_adventure_bytes.match( line.rstrip(b"\r\n") ) ):
+				starts.append( (offset, n) )
+			offset += len(line)
+	return starts
+
+def parse_chunk(task):
+	'''Parse one chunk of a log in a worker process.  task is (path, byte
+	offset, first line number, line number of the next chunk or None,
+	progress_meter level, whether to profile).
+
+	The encounter that is in progress when we reach the next chunk may have
+	started with metadata lines before that chunk's first adventure, so we
+	parse it to the end here.  Return (encounters, ends, profile), where
+	ends[i] is the number of the line after encounters[i].  The encounters
+	are sent back as records, see encounter.record(), and so is the profiler,
+	if there is one.'''
+	path, offset, start, until, level, profiling = task
+	profile = profiler() if profiling else None
+	# Only debug output makes sense from a worker; the rates are shown by
+	# ingest.parse_chunks().
+	progress = progress_meter(level) if level >= progress_meter.debug else None
+	encounters = []
+	ends = []
+	count = start
+	for name, f, tell in open_logs( path, offset ):
+		lines = lineiter( log_lines(f, profile), count )
+		for enc in parselines( lines, until, progress, profile ):
+			encounters.append( enc.record() )
+			ends.append( lines.count )
+		count = lines.count
+	return (encounters, ends, profile.record() if profile else None)
+
+def new_encounters(chunk, ends, done, keep=None):
+	'''Turn the records of a parse_chunk() result back into encounters,
+	dropping the ones that end on or before line done because the previous
+	chunk already parsed them.  The ones keep(record) returns False for are
+	replaced by metadata_only() encounters.  Return the encounters, how many
+	adventures they are, and the line the chunk got to.'''
+	encounters = []
+	for record, end in zip(chunk, ends):
+		if end > done:
+			enc = encounter.from_record(record)
+			if keep is not None and not keep(record):
+				enc = metadata_only( enc.metadata )
+			encounters.append( enc )
+	if ends:
+		done = max( done, ends[-1] )
+	return encounters, len(encounters), done
+
+def parse_files(paths, jobs=1, cache=None, progress=None, profile=None, seen=None):
+	'''Parse log files in order, skipping any file that is in the
+	encounter_cache.  Return a list of encounters.  If seen is a
+	seen_encounters, logs and encounters that it has already seen are left
+	out.  With jobs > 1, the logs are parsed by ingest.parse_chunks() in
+	jobs processes, which needs python 3.5 or newer; older pythons parse
+	them one at a time.'''
+	if progress is None:
+		progress = progress_meter( progress_meter.silent )
+	parsed = {}
+	todo = []
+	wanted = []
+	for path in paths:
+		if seen is not None:
+			with timed( profile, "seen.new_file" ):
+				new = seen.new_file(path)
+			if not new:
+				progress.message( "\n*** Already seen: %s\n" % path )
+				continue
+		wanted.append( path )
+		encounters = None
+		if cache:
+			with timed( profile, "cache.get" ):
+				encounters = cache.get(path)
+		if encounters is None:
+			todo.append( path )
+		else:
+			progress.message( "\n*** Cached file: %s\n" % path )
+			parsed[path] = encounters
+	for path in todo:
+		progress.expect( os.path.getsize(path) )
+	parse_chunks = None
+	if jobs > 1 and todo:
+		try:
+			from .ingest import parse_chunks
+		except (ImportError, SyntaxError):
+			# ingest needs asyncio and python 3.5
+			pass
+	if parse_chunks is not None:
+		results = [ [] for path in todo ]
+		with timed( profile, "parse_chunks", len(todo) ):
+			parse_chunks(
+				todo, lambda n, encounters: results[n].extend( encounters ),
+				jobs, progress, profile )
+	else:
+		results = []
+		for path in todo:
+			progress.message( "\n*** Parsing file: %s\n" % path )
+			with timed( profile, "parse file" ) as timer:
+				encounters = []
+				for name, f, tell in open_logs(path):
+					if name != path:
+						progress.message( "*** Parsing %s" % name )
+					progress.start( tell )
+					lines = lineiter( log_lines(f, profile) )
+					encounters.extend( parselines( lines, progress=progress, profile=profile ) )
+					progress.end( lines.count, 0 )
+					timer.lines += lines.count
+				progress.end( 0, os.path.getsize(path) )
+				results.append( encounters )
+	progress.finish()
+	for path, encounters in zip( todo, results ):
+		parsed[path] = encounters
+		if cache:
+			with timed( profile, "cache.put" ):
+				cache.put( path, encounters )
+	if cache:
+		cache.save()
+	encounters = []
+	for path in wanted:
+		if seen is not None:
+			with timed( profile, "seen.filter", len(parsed[path]) ):
+				parsed[path] = seen.filter( parsed[path] )
+		encounters.extend( parsed[path] )
+	return encounters
+
+def follow(path, statepath, trace=True, progress=None, profile=None, details=True, groups=None):
+	'''Parse whatever has been appended to the log at path since the last
+	call, and add it to the analyzer saved in statepath.  An encounter that is
+	still being written is left for next time.  Return the analyzer.'''
+	if groups is None:
+		groups = default_rules()
+	state = None
+	try:
+		with io.open( statepath, "rb" ) as f:
+			state = pickle.load(f)
+	except (
+			IOError, OSError, EOFError, ValueError, AttributeError, ImportError,
+			pickle.UnpicklingError ):
+		# AttributeError and ImportError mean the state was saved by a version
+		# that kept its classes somewhere else.
+		pass
+	with io.open( path, "rb" ) as f:
+		if not (
+				state and state.get("version") == follow_version and
+				state["path"] == os.path.abspath(path) and
+				state["offset"] <= os.path.getsize(path) and
+				checksum( f, state["offset"] ) == state["check"] and
+				state["analyzer"].details == details and
+				state["analyzer"].groups.monsters == groups.monsters and
+				state["analyzer"].groups.items == groups.items ):
+			# First run, or the log was replaced.
+			state = {
+				"version": follow_version,
+				"path": os.path.abspath(path),
+				"offset": 0,
+				"check": None,
+				"analyzer": analyzer(trace, details, groups) }
+		f.seek( state["offset"] )
+		data = f.read()
+	if not trace:
+		state["analyzer"].trace = None
+	# Leave off a line that hasn't been finished yet.
+	data = data[ : data.rfind(b"\n") + 1 ]
+	starts = [0]
+	lines = data.split(b"\n")[:-1]
+	for line in lines:
+		starts.append( starts[-1] + len(line) + 1 )
+	lines = decode_lines( [ line.rstrip(b"\r") for line in lines ] )
+	if progress is None:
+		progress = progress_meter( progress_meter.silent )
+	progress.message( "\n*** Following file: %s (%d new lines)\n" % ( path, len(lines) ) )
+	progress.expect( len(data) )
+	lines = lineiter(lines)
+	progress.start( lambda: starts[ min( lines.count, len(starts) - 1 ) ] )
+	done = 0
+	for enc in parselines( lines, progress=progress, profile=profile ):
+		if lines.exhausted:
+			# The log ends in the middle of this encounter.
+			break
+		with timed( profile, "analyzer.add" ):
+			state["analyzer"].add( enc )
+		done = lines.count
+	progress.end( lines.count, len(data) )
+	progress.finish()
+	state["offset"] += starts[done]
+	with io.open( path, "rb" ) as f:
+		state["check"] = checksum( f, state["offset"] )
+	with io.open( statepath + ".tmp", "wb" ) as f:
+		pickle.dump( state, f, pickle.HIGHEST_PROTOCOL )
+	replace_file( statepath + ".tmp", statepath )
+	return state["analyzer"]
+
+def save_partial(analysis, path):
+	'''Save an analyzer's partial() as JSON, so it can be merged with the
+	partials of other logs, maybe from other players, by merge_partials().'''
+	partial = analysis.partial()
+	partial["format"] = "kol_parse partial"
+	partial["version"] = partial_version
+	with io.open( path + ".tmp", "w", encoding="utf-8" ) as f:
+		f.write( json.dumps(partial) )
+	replace_file( path + ".tmp", path )
+
+def load_partial(path):
+	'''Load a partial saved by save_partial().  Raise ValueError if the file
+	isn't one, or was saved in a format this version can't read.'''
+	with io.open( path, encoding="utf-8" ) as f:
+		partial = json.load(f)
+	if not isinstance( partial, dict ) or partial.get("format") != "kol_parse partial":
+		raise ValueError( "%s is not a kol_parse partial" % path )
+	if partial.get("version") != partial_version:
+		raise ValueError( "%s is a version %s partial, but this kol_parse reads version %d" % (
+			path, partial.get("version"), partial_version ) )
+	return partial
+
+def merge_partials(paths):
+	'''Merge the partials saved at paths into a new analyzer, which has no
+	trace or details, and return it.  The result can be saved with
+	save_partial() and merged again.'''
+	analysis = analyzer( trace=False, details=False )
+	for path in paths:
+		analysis.merge( load_partial(path) )
+	return analysis
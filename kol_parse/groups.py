@@ -0,0 +1,65 @@
+'''
+Groups of monsters and items that are also counted together, like all of the
+smut orcs that drop the same things.  The groups that come with kol_parse are
+in groups.json; more can be added from other files in the same format.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import io
+import os
+import json
+
+# The rules in groups.json, loaded by default_rules() the first time they are
+# needed.
+default = None
+
+#Classes
+
+class group_rules(object):
+	'''Maps monster and item names to the groups they are in.  A name can be
+	in any number of groups, and a group can have any number of members.
+
+	Rules are dicts like groups.json: {"monsters": {group: [names]},
+	"items": {group: [names]}}.  The group names are what show up in the
+	report, so by convention they are in parentheses.'''
+	def __init__(self, rules=None):
+		self.monsters = {}
+		self.items = {}
+		if rules:
+			self.add( rules )
+	def add(self, rules):
+		'''Add the groups from a rules dict.'''
+		for kind, groups in ( ("monsters", self.monsters), ("items", self.items) ):
+			for group, names in rules.get( kind, {} ).items():
+				for name in names:
+					if group not in groups.get( name, () ):
+						groups[name] = groups.get( name, () ) + (group,)
+	def load(self, path):
+		'''Add the groups from a JSON file.  Raise ValueError if it isn't a
+		rules file.'''
+		with io.open( path, encoding="utf-8" ) as f:
+			rules = json.load(f)
+		if not isinstance( rules, dict ) or not set(rules) <= set( ("monsters", "items") ):
+			raise ValueError( "%s is not a groups file: it should have \"monsters\" and \"items\"" % path )
+		self.add( rules )
+	def copy(self):
+		rules = group_rules()
+		rules.monsters = dict(self.monsters)
+		rules.items = dict(self.items)
+		return rules
+	def monster_groups(self, name):
+		'''Return the groups a monster is in, as a tuple.'''
+		return self.monsters.get( name, () )
+	def item_groups(self, name):
+		return self.items.get( name, () )
+
+#Functions
+
+def default_rules():
+	'''Return the rules in groups.json.  They are only read once, so don't
+	change them; copy() them first.'''
+	global default
+	if default is None:
+		default = group_rules()
+		default.load( os.path.join( os.path.dirname( os.path.abspath(__file__) ), "groups.json" ) )
+	return default
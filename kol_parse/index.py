@@ -0,0 +1,256 @@
+'''
+A sparse index of where the adventures are in a log, so that a range of
+adventures can be parsed without reading the log from the top.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import io
+import os
+import json
+import array
+import bisect
+
+from .parser import toolbox, lineiter, metadata_class, parselines
+from .symbols import symbols
+from .files import open_logs, log_lines, is_plain, metadata_only, replace_file, checksum
+from .progress import progress_meter
+
+#Classes
+
+class adventure_index(object):
+	'''Every step-th adventure of a plain log: its number, and the byte offset
+	and the metadata the log had set by the encounter it starts, so parsing
+	can start at any entry with the right modifiers.  Only what the log
+	itself set is kept, see advance(), so that the modifiers carried over
+	from the logs before it still count.  The entries' metadata are interned
+	in keys, as metadata_class.key()s, and state is the metadata the log had
+	set where the index ends.  ordered is cleared if the adventure numbers
+	ever go down, e.g. after an ascension, and then start() always gives the
+	top of the log.
+
+	The index is saved as JSON in indexpath.  It covers the first size bytes
+	of the log, and update() only parses what was added after that.  check
+	is a hash of the bytes just before size, which tells whether the log
+	grew or was replaced.'''
+	version = 2
+	def __init__(self, path, indexpath, step=100):
+		self.path = path
+		self.indexpath = indexpath
+		self.step = step
+		self.reset()
+		try:
+			with io.open( indexpath, encoding="utf-8" ) as f:
+				saved = json.load(f)
+		except (IOError, OSError, ValueError):
+			return
+		if saved.get("version") != adventure_index.version or saved["step"] != step:
+			return
+		for key in saved["keys"]:
+			self.keys.id( metadata_class.from_record(key).key() )
+		self.state = metadata_class.from_record( saved["state"] ).copy()
+		for num, offset, key in saved["entries"]:
+			self.nums.append( num )
+			self.offsets.append( offset )
+			self.key_at.append( key )
+		self.size = saved["size"]
+		self.last = saved["last"]
+		self.check = saved["check"]
+		self.since = saved["since"]
+		self.ordered = saved["ordered"]
+	def reset(self):
+		self.keys = symbols()
+		self.state = metadata_class()
+		self.nums = array.array("l")
+		self.offsets = array.array("l")
+		self.key_at = array.array("l")
+		self.size = 0
+		# the number of the last adventure indexed
+		self.last = 0
+		self.check = None
+		# adventures since the last entry
+		self.since = 0
+		self.ordered = True
+	def __len__(self):
+		return len(self.nums)
+	def advance(self, changes):
+		'''Bring an encounter's metadata, or None, into state the way the
+		analyzer does, except that stat points gained before the log gives a
+		stat's base are kept as points instead of being added to a base of 0,
+		so the analyzer adds them to the base it already has.'''
+		state = self.state
+		unknown = [ not base for base in state.statbases ]
+		points = list( state.statpoints )
+		state.import_from( changes )
+		for whichstat in toolbox.statnums:
+			if unknown[whichstat] and not ( changes and changes.statbases[whichstat] ):
+				state.statbases[whichstat] = 0
+				state.statpoints[whichstat] = points[whichstat] + (
+					changes.statpoints[whichstat] if changes else 0 )
+	def save(self):
+		saved = {
+			"version": adventure_index.version,
+			"step": self.step,
+			"size": self.size,
+			"last": self.last,
+			"check": self.check,
+			"since": self.since,
+			"ordered": self.ordered,
+			"state": self.state.key(),
+			"keys": self.keys.names,
+			"entries": list( zip( self.nums, self.offsets, self.key_at ) ) }
+		with io.open( self.indexpath + ".tmp", "w", encoding="utf-8" ) as f:
+			f.write( json.dumps(saved) )
+		replace_file( self.indexpath + ".tmp", self.indexpath )
+	def update(self, progress=None):
+		'''Index whatever was added to the log since the last update, or all
+		of it if the log was replaced, and save the index.  The encounter that
+		the log ends in might still be being written, so it is left for next
+		time.'''
+		if progress is None:
+			progress = progress_meter( progress_meter.silent )
+		size = os.path.getsize( self.path )
+		with io.open( self.path, "rb" ) as f:
+			if size < self.size or checksum( f, self.size ) != self.check:
+				self.reset()
+		if size == self.size:
+			return
+		progress.message( "\n*** Indexing file: %s\n" % self.path )
+		progress.expect( size - self.size )
+		# The new entries' line numbers, counted from self.size
+		starts = []
+		end = 0
+		for name, f, tell in open_logs( self.path, self.size ):
+			progress.start( lambda: tell() - self.size )
+			lines = lineiter( finished_lines( log_lines(f) ) )
+			for enc in parselines( lines, progress=progress ):
+				if lines.exhausted:
+					break
+				if enc.location:
+					if enc.num < self.last:
+						self.ordered = False
+					self.last = enc.num
+					if self.since % self.step == 0:
+						starts.append( end )
+						self.nums.append( enc.num )
+						self.key_at.append( self.keys.id( self.state.key() ) )
+					self.since += 1
+				self.advance( enc.metadata )
+				end = lines.count
+			progress.end( lines.count, size - self.size )
+		progress.finish()
+		with io.open( self.path, "rb" ) as f:
+			offsets = line_offsets( f, self.size, starts + [end] )
+			if len(offsets) != len(starts) + 1:
+				# The log changed while we read it.  Start again next time,
+				# and parse from the top until then.
+				self.reset()
+				return
+			self.offsets.extend( offsets[:-1] )
+			self.size = offsets[-1]
+			self.check = checksum( f, self.size )
+		self.save()
+	def start(self, num):
+		'''Return (offset, metadata) for where to start parsing to get every
+		encounter of adventure num and later: the last entry before num, and
+		the metadata the log had set by then, or (0, None) for the top of the
+		log.'''
+		i = bisect.bisect_left( self.nums, num ) - 1 if self.ordered else -1
+		if i < 0:
+			return 0, None
+		return self.offsets[i], metadata_class.from_record( self.keys[ self.key_at[i] ] )
+
+#Functions
+
+def index_path(path):
+	'''Return where the index of the log at path is saved:
+	kol_parse_<log>.index next to it.'''
+	directory, name = os.path.split(path)
+	dot = name.rfind(".")
+	if dot > 0:
+		name = name[:dot]
+	return os.path.join( directory, "kol_parse_" + name + ".index" )
+
+def finished_lines(lines):
+	'''Yield all but the last of lines from log_lines(), which is what comes
+	after the last newline: nothing, or a line that is still being written.
+	Otherwise the parser would take it for the blank line that ends the
+	encounter the log ends in.'''
+	lines = iter(lines)
+	previous = next( lines, None )
+	for line in lines:
+		yield previous
+		previous = line
+
+def line_offsets(f, offset, numbers):
+	'''Return the byte offsets of the lines numbered numbers, in order, of a
+	binary file object, counting from line 0 at byte offset.'''
+	offsets = []
+	wanted = iter(numbers)
+	target = next( wanted, None )
+	line = 0
+	position = offset
+	f.seek(offset)
+	while target is not None:
+		data = f.read(1<<20)
+		if not data:
+			break
+		start = 0
+		while target is not None:
+			if line + data.count( b"\n", start ) < target:
+				line += data.count( b"\n", start )
+				break
+			while line < target:
+				start = data.index( b"\n", start ) + 1
+				line += 1
+			offsets.append( position + start )
+			target = next( wanted, None )
+		position += len(data)
+	return offsets
+
+def parse_adventures(path, first, last=None, progress=None, profile=None):
+	'''Yield the encounters of adventures first to last of the log at path,
+	or to the end if last is None.  Plain logs are indexed first, see
+	adventure_index, and parsing starts at the last entry before first, with
+	a metadata_only() encounter that brings in what the log had set by then.
+	Other logs are parsed from the top.  Encounters of other adventures are
+	yielded as metadata_only() ones, so the modifiers they logged still
+	count, and if parsing stops before the end of a plain log a last one
+	brings in what the rest of it set, for the logs that follow.'''
+	if progress is None:
+		progress = progress_meter( progress_meter.silent )
+	offset = 0
+	index = None
+	ordered = False
+	if is_plain(path):
+		index = adventure_index( path, index_path(path) )
+		index.update( progress )
+		offset, metadata = index.start( first )
+		ordered = index.ordered
+		if metadata is not None:
+			yield metadata_only( metadata )
+	progress.message( "\n*** Parsing adventures %d to %s of %s\n" % (
+		first, "the end" if last is None else last, path ) )
+	size = os.path.getsize(path)
+	progress.expect( size - offset )
+	for name, f, tell in open_logs( path, offset ):
+		progress.start( lambda: tell() - offset )
+		lines = lineiter( log_lines(f, profile) )
+		for enc in parselines( lines, progress=progress, profile=profile ):
+			if enc.location:
+				after = last is not None and enc.num > last
+				if after and ordered:
+					# The rest of the log is later still.  Its stat points
+					# are left out where the log never gave the base, as
+					# the index has them along with the ones parsed here.
+					rest = index.state.copy()
+					for whichstat in toolbox.statnums:
+						if not rest.statbases[whichstat]:
+							rest.statpoints[whichstat] = 0
+					yield metadata_only( rest )
+					break
+				if after or enc.num < first:
+					enc = metadata_only( enc.metadata )
+			yield enc
+		progress.end( lines.count, 0 )
+	progress.end( 0, size - offset )
+	progress.finish()
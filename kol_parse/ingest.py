@@ -0,0 +1,161 @@
+'''
+Parse many logs at once with asyncio, adding the encounters to an analyzer as
+they arrive instead of keeping them all.  This is how logs are parsed with
+more than one process.  It needs python 3.5 or newer.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import os
+import gc
+import asyncio
+import functools
+import concurrent.futures
+
+from .files import split_log, parse_chunk, new_encounters
+from .progress import progress_meter
+from .profiling import timed
+
+#Functions
+
+def split_chunks(path, chunk_bytes):
+	'''Split the log at path into chunks of about chunk_bytes.'''
+	return split_log( path, max( os.path.getsize(path) // chunk_bytes, 1 ), chunk_bytes )
+
+async def produce(loop, paths, queue, pool, reader, chunk_bytes, level, profiling):
+	'''Split the logs, several at a time in the reader threads, and queue the
+	parse_chunk() future for each chunk in order, with the number of its log
+	in paths.  The queue is bounded, so only a few chunks are parsed ahead of
+	the analyzer.  None is queued at the end.'''
+	splits = [ loop.run_in_executor( reader, split_chunks, path, chunk_bytes ) for path in paths ]
+	try:
+		for n, (path, split) in enumerate( zip( paths, splits ) ):
+			starts = await split
+			for i, (offset, start) in enumerate(starts):
+				until = starts[i+1][1] if i+1 < len(starts) else None
+				task = ( path, offset, start, until, level, profiling )
+				next_offset = starts[i+1][0] if i+1 < len(starts) else None
+				future = loop.run_in_executor( pool, parse_chunk, task )
+				await queue.put( (n, task, next_offset, future) )
+	except asyncio.CancelledError:
+		raise
+	except Exception:
+		# Let consume() finish, then the error is raised by ingest().
+		await queue.put( None )
+		raise
+	await queue.put( None )
+
+async def consume(queue, add, progress, profile, seen):
+	'''Call add(n, encounters) with the encounters of each queued chunk, in
+	order, where n is the number of their log.  If seen is a
+	seen_encounters, the ones it has seen in other logs are left out.'''
+	done = 0
+	size = 0
+	keep = None
+	while True:
+		item = await queue.get()
+		if item is None:
+			break
+		n, task, next_offset, future = item
+		path, offset, start, until, level, profiling = task
+		chunk, ends, chunk_profile = await future
+		if chunk_profile:
+			profile.merge( chunk_profile )
+		if start == 0:
+			progress.message( "\n*** Parsing file: %s\n" % path )
+			progress.start()
+			size = os.path.getsize(path)
+			done = 0
+			if seen is not None:
+				keep = functools.partial( seen.new, source=seen.source() )
+		encounters, adventures, done = new_encounters( chunk, ends, done, keep )
+		add( n, encounters )
+		if next_offset is not None:
+			progress.update( done, adventures, next_offset )
+		else:
+			progress.update( done, adventures, size )
+			progress.end( done, size )
+
+async def pipeline(loop, paths, add, pool, reader, chunk_bytes, queue_size, progress, profile, seen):
+	queue = asyncio.Queue( maxsize=queue_size )
+	producer = asyncio.ensure_future( produce(
+		loop, paths, queue, pool, reader, chunk_bytes, progress.level,
+		profile is not None ) )
+	try:
+		await consume( queue, add, progress, profile, seen )
+	except BaseException:
+		producer.cancel()
+		try:
+			await producer
+		except BaseException:
+			pass
+		raise
+	await producer
+
+def parse_chunks(
+		paths, add, jobs=1, progress=None, profile=None, chunk_bytes=4<<20,
+		queue_size=None, seen=None):
+	'''Parse the logs at paths and call add(n, encounters) with their
+	encounters a chunk at a time, where n is the number of the chunk's log in
+	paths.  The chunks come in the same order as parsing the logs one at a
+	time would give their encounters.  The logs are split into chunks of
+	about chunk_bytes by a few reader threads at once, and the chunks are
+	parsed by jobs worker processes (or a thread, if jobs is 1).  At most
+	queue_size chunks (twice jobs by default) are parsed ahead of add, so
+	memory use doesn't grow with the number of logs unless add keeps the
+	encounters.  If seen is a seen_encounters, encounters it has seen in
+	other logs are left out.'''
+	if progress is None:
+		progress = progress_meter( progress_meter.silent )
+	if jobs > 1:
+		pool = concurrent.futures.ProcessPoolExecutor(jobs)
+	else:
+		pool = concurrent.futures.ThreadPoolExecutor(1)
+	reader = concurrent.futures.ThreadPoolExecutor(4)
+	loop = asyncio.new_event_loop()
+	asyncio.set_event_loop(loop)
+	# Unpickling the chunks creates lots of containers and no garbage, and
+	# the cyclic garbage collector would otherwise keep rescanning them.
+	gc_was_enabled = gc.isenabled()
+	gc.disable()
+	try:
+		loop.run_until_complete( pipeline(
+			loop, paths, add, pool, reader, chunk_bytes,
+			queue_size or 2 * jobs, progress, profile, seen ) )
+	finally:
+		if gc_was_enabled:
+			gc.enable()
+		asyncio.set_event_loop(None)
+		loop.close()
+		pool.shutdown()
+		reader.shutdown()
+
+def ingest(
+		paths, analysis, jobs=1, progress=None, profile=None, chunk_bytes=4<<20,
+		queue_size=None, seen=None):
+	'''Parse the logs at paths with parse_chunks() and add their encounters
+	to analysis as they arrive, in the same order as parsing them one at a
+	time, so the metadata carried from one log to the next is right.  If
+	seen is a seen_encounters, logs and encounters it has already seen are
+	skipped.  Return analysis.'''
+	if progress is None:
+		progress = progress_meter( progress_meter.silent )
+	if seen is not None:
+		new_paths = []
+		for path in paths:
+			with timed( profile, "seen.new_file" ):
+				new = seen.new_file(path)
+			if new:
+				new_paths.append( path )
+			else:
+				progress.message( "\n*** Already seen: %s\n" % path )
+		paths = new_paths
+	for path in paths:
+		progress.expect( os.path.getsize(path) )
+	def add(n, encounters):
+		with timed( profile, "analyzer.add", len(encounters) ):
+			for enc in encounters:
+				analysis.add( enc )
+	parse_chunks(
+		paths, add, jobs, progress, profile, chunk_bytes, queue_size, seen )
+	progress.finish()
+	return analysis
@@ -0,0 +1,754 @@
+'''
+Parse KoLMafia session logs into encounters.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import re
+import time
+import zlib
+
+try:
+    import html.parser as html_parser
+except ImportError:
+    import HTMLParser as html_parser
+
+from .symbols import memoized, intern_name
+
+#Classes
+
+class toolbox(object):
+	html_parser = None # only needed by unescape() on old pythons
+	statnums = {
+			0 : "Muscle",
+			1 : "Mysticality",
+			2 : "Moxie" }
+	statwords = None # see statwords()
+	statnumbers = None # see statnum()
+	statspellings = (
+		(	"Muscle", "Mus", "0",
+			"Beefiness", "Fortitude", "Muscleboundness", "Strengthliness", "Strongness",
+			"Seal Clubber", "Turtle Tamer", "Avatar of Boris", "Zombie Master" ),
+		(	"Mysticality", "Mys", "1",
+			"Enchantedness", "Magicalness", "Mysteriousness", "Wizardliness",
+			"Pastamancer", "Sauceror", "Mysticism" ),
+		(	"Moxie", "Mox", "2",
+			"Cheek", "Chutzpah", "Roguishness", "Sarcasm", "Smarm",
+			"Disco Bandit", "Accordion Thief" ) )
+
+class searches(object):
+	'''The regular expressions for lines we care about.  See classify().'''
+	a = "\\A"
+	z = "\\Z"
+	re_charclass  = re.compile( a+"Class: ([ A-DMPSTZa-fhil-or-v]+)"+z )
+	re_statbase   = re.compile( a+"(Mus|Mys|Mox): (\\d+)( \\((\\d+)\\))?, tnp = \\d+" )
+	re_statday    = re.compile( a+"([A-Za-z]+) bonus today" )
+	re_bonus_crap = re.compile( a+"(ML|Enc|Init|Exp|Meat|Item): ([\\+\\-][\\d]+\\.?\\d*)%?"+z )
+	re_bbs_tag    = re.compile(   "\\[kol_parse\\];" )
+	re_bbs_info   = re.compile(   " ([^=;]+)=([^=;]+);" )
+	re_adventure  = re.compile( a+"\\[(\\d+)\\] (.+)" )
+	re_encounter  = re.compile( a+"Encounter: (.+)" )
+	re_round      = re.compile( a+"Round (\\d+):" )
+	re_jump       = re.compile(   " wins initiative!" )
+	re_steal      = re.compile(   " tries to steal an item!" )
+	re_ravesteal  = re.compile( a+"Rave combo: Rave Steal"+z )
+	re_deal       = re.compile(   " brokers a quick deal, and splits the profits with you." )
+	re_mondmg     = re.compile(   ": (.+) takes (\\d+) damage\\."+z )
+	re_losehp     = re.compile( a+"You lose (\\d+) hit points?"+z )
+	re_geteffect  = re.compile( a+"You acquire an effect: (.+) \\(duration: (\\d+)" )
+	re_win        = re.compile(   " wins the fight!" )
+	re_meat       = re.compile( a+"You gain (\\d+) Meat" )
+	re_item       = re.compile( a+"You acquire an item: (.+)" )
+	re_multi_item = re.compile( a+"You acquire (.+) \\((\\d+)\\)"+z )
+	re_gainstat   = re.compile( a+"You gain (\\d+) ([BCEFMRSWa-ik-pr-uyz]+)"+z )
+	re_statpoint  = re.compile( a+"You gain a (Muscle|Mysticality|Moxie) point!" )
+	re_adventure_bytes = re.compile( b"\\A\\[\\d+\\] ." )
+	# Every undecoded line that classify() could find anything in starts with
+	# one of relevant_prefixes or has re_relevant_bytes in it.  See
+	# decode_lines().
+	relevant_prefixes = ( b"[", b"Class: ", b"Mus: ", b"Mys: ", b"Mox: ", b"ML: ",
+		b"Enc: ", b"Exp: ", b"Meat: ", b"Item: ", b"Init: ", b"Encounter: ",
+		b"Round ", b"You ", b"Rave combo: " )
+	re_relevant_bytes = re.compile(
+		b" bonus today|\\[kol_parse\\];| wins initiative!| damage\\.\\Z| wins the fight!|"
+		b" tries to steal an item!| brokers a quick deal" )
+	bonus_crap_prefixes = ( "ML: ", "Enc: ", "Init: ", "Exp: ", "Meat: ", "Item: " )
+
+class linematch(object):
+	'''What classify() found on one line.  kind names the first thing the
+	parser cares about (e.g. "adventure", "meat", "item") and match is its
+	regex match.  round, steal and deal can show up on the same line as
+	anything else, so they are kept separately.'''
+	__slots__ = ( "kind", "match", "round", "steal", "deal", "outside_combat", "bbs_info" )
+	def __init__(self, kind=None, match=None):
+		self.kind = kind
+		self.match = match
+		self.round = None
+		self.steal = False
+		self.deal = False
+		self.outside_combat = False
+		self.bbs_info = None
+
+# Shared result for lines that match nothing.  Nobody modifies it.
+nomatch = linematch()
+
+# Stands in for a line that was skipped without being decoded.  It isn't
+# blank, since a blank line ends an encounter, and no real line can be it.
+skipped_line = "\n"
+
+class lineiter(object):
+	'''Iterate over lines, allowing the parser to push back a line it has read
+	but that belongs to the next encounter.  count is the number of the next
+	line that will be returned, and exhausted is set once there are no more.'''
+	def __init__(self, lines, count=0):
+		self.lines = iter(lines)
+		self.pushed = []
+		self.count = count
+		self.exhausted = False
+	def __iter__(self):
+		return self
+	def __next__(self):
+		if self.pushed:
+			line = self.pushed.pop()
+		else:
+			try:
+				line = next(self.lines)
+			except StopIteration:
+				self.exhausted = True
+				raise
+		self.count += 1
+		return line
+	next = __next__
+	def pushback(self, line):
+		self.pushed.append(line)
+		self.count -= 1
+
+class encounter(object):
+	'''One adventure, or the lines before the first one.  metadata only holds
+	what the encounter's own lines logged, and is None if they logged nothing,
+	which is most of the time.  linehash is a CRC of the lines from the
+	adventure line on, including the ones nothing was parsed from, like most
+	combat actions, so that encounters that parse the same but weren't the
+	same lines can be told apart.  snapshot is set by the analyzer to the id
+	of the metadata snapshot in effect for it, see snapshots.'''
+	__slots__ = (
+		"num", "location", "title", "monstername", "metadata", "iscombat",
+		"jump", "effects", "won", "mondamages", "meat", "items", "stolenitems",
+		"miscitems", "stats", "linehash", "snapshot" )
+	def __init__(self):
+		self.num = 0
+		self.location = ""
+		self.title = ""
+		self.monstername = None
+		self.metadata = None
+		self.iscombat = False
+		self.jump = False
+		self.effects = []
+		self.won = False
+		self.mondamages = {}
+		self.meat = 0
+		self.items = []
+		self.stolenitems = []
+		self.miscitems = []
+		self.stats = [0, 0, 0]
+		self.linehash = 0
+		self.snapshot = None
+	def changemetadata(self):
+		'''Return the metadata to record a metadata line in, creating it for
+		the first one.'''
+		if self.metadata is None:
+			self.metadata = metadata_class()
+		return self.metadata
+	def copy(self):
+		enc = encounter()
+		enc.num = self.num
+		enc.location = self.location
+		enc.title = self.title
+		enc.monstername = self.monstername
+		enc.metadata = self.metadata
+		enc.iscombat = self.iscombat
+		enc.jump = self.jump
+		enc.won = self.won
+		for key in self.mondamages:
+			enc.mondamages[key] = self.mondamages[key].copy()
+		enc.meat = self.meat
+		enc.items = self.items.copy()
+		enc.stolenitems = self.stolenitems.copy()
+		enc.miscitems = self.miscitems.copy()
+		enc.stats = self.stats.copy()
+		enc.linehash = self.linehash
+		enc.snapshot = self.snapshot
+		return enc
+	def record(self):
+		'''Return the encounter as a tuple of plain values, which is much
+		cheaper to pickle than the object itself.'''
+		return (
+			self.num, self.location, self.title, self.monstername,
+			self.metadata.record() if self.metadata else None,
+			self.iscombat, self.jump, self.effects, self.won, self.mondamages,
+			self.meat, self.items, self.stolenitems, self.miscitems, self.stats,
+			self.linehash )
+	@staticmethod
+	def from_record(record):
+		enc = encounter.__new__(encounter)
+		(	enc.num, enc.location, enc.title, enc.monstername, metadata,
+			enc.iscombat, enc.jump, enc.effects, enc.won, enc.mondamages,
+			enc.meat, enc.items, enc.stolenitems, enc.miscitems, enc.stats,
+			enc.linehash ) = record
+		enc.metadata = metadata_class.from_record(metadata) if metadata else None
+		enc.snapshot = None
+		return enc
+	def __str__(self):
+		st = "Combat" if self.iscombat else "Noncombat"
+		st += " #%d" % self.num
+		if self.location:
+			st += " (%s)" % self.location
+		if self.monstername:
+			st += ": %s" % self.monstername
+		elif self.title:
+			st += ": %s" % self.title
+		return st
+	def __gt__(self, other):
+		return self.title > other.title
+	def __lt__(self, other):
+		return self.title < other.title
+	def overview(self):
+		st = str(self)
+		if self.items:
+			st += "\nFound %s" % self.items
+		if self.stolenitems:
+			st += "\Stole %s" % self.stolenitems
+		if self.miscitems:
+			st += "\nSomehow gained %s" % self.miscitems
+		if sum( [sum(self.mondamages[key]) for key in self.mondamages] ):
+			st += "\nMonster took damage %s" % self.mondamages
+		if sum(self.stats):
+			st += "\nGained stats %s" % self.stats
+		return st
+
+class metadata_class(object):
+	__slots__ = (
+		"charclass", "mainstatnum", "statbases", "statpoints", "statday",
+		"statdaynum", "ml", "combat", "init", "real_init", "stat", "meat", "item" )
+	def __init__(self):
+		self.charclass = None
+		self.mainstatnum = None
+		self.statbases = [0, 0, 0]
+		self.statpoints = [0, 0, 0]
+		self.statday = None
+		self.statdaynum = None
+		self.ml = None
+		self.combat = None
+		self.init = None
+		self.real_init = None
+		self.stat = None
+		self.meat = None
+		self.item = None
+	def setclass(self, charclass):
+		self.charclass = charclass
+		self.mainstatnum = statnum(charclass)
+	def setstatbase(self, whichstat, amount):
+		whichstat = statnum(whichstat)
+		self.statbases[whichstat] = int(amount)
+		self.statpoints[whichstat] = 0
+	def gainstatpoint(self, whichstat):
+		whichstat = statnum(whichstat)
+		if self.statbases[whichstat]:
+			self.statbases[whichstat] += 1
+		else:
+			self.statpoints[whichstat] += 1
+	def setstatday(self, statday):
+		self.statday = statday
+		self.statdaynum = statnum(statday)
+	def setval(self, key, val):
+		key = str(key).lower()
+		if key == "class":
+			self.setclass(val)
+		elif key == "ml":
+			self.ml = int(float(val))
+		elif key == "enc":
+			self.combat = int(float(val))
+		elif key == "init":
+			self.init = int(float(val))
+		elif key == "real_init":
+			self.real_init = int(float(val))
+		elif key == "exp":
+			self.stat = float(val) * 2
+		elif key == "meat":
+			self.meat = float(val) / 100 + 1
+		elif key == "item":
+			self.item = float(val) / 100 + 1
+		elif key in statwords():
+			self.setstatbase(key, val)
+	def initiative(self):
+		initiative = None
+		mainstat = 0
+		if self.mainstatnum in toolbox.statnums:
+			mainstat = self.statbases[self.mainstatnum]
+		if   self.ml <=  20:
+			initiative = self.init
+		elif self.ml <=  40:
+			initiative = self.init - self.ml     +  20
+		elif self.ml <=  60:
+			initiative = self.init - self.ml * 2 +  60
+		elif self.ml <=  80:
+			initiative = self.init - self.ml * 3 + 120
+		elif self.ml <= 100:
+			initiative = self.init - self.ml * 4 + 200
+		else:
+			initiative = self.init - self.ml * 5 + 300
+		return (initiative, mainstat, self.ml)
+	def copy(self):
+		metadata = metadata_class.from_record( self.record() )
+		metadata.statbases = list( self.statbases )
+		metadata.statpoints = list( self.statpoints )
+		return metadata
+	def key(self):
+		'''Return the values as a tuple that can be hashed, so equal metadata
+		can be found in a dict.'''
+		return (
+			self.charclass, self.mainstatnum, tuple(self.statbases),
+			tuple(self.statpoints), self.statday, self.statdaynum, self.ml,
+			self.combat, self.init, self.real_init, self.stat, self.meat,
+			self.item )
+	def import_from(self, other):
+		'''Bring in what an encounter's metadata logged.  other is None for an
+		encounter that logged nothing, which only adds in the stat points
+		gained in the one before.'''
+		if other is None:
+			for whichstat in toolbox.statnums:
+				self.statbases[whichstat] += self.statpoints[whichstat]
+				self.statpoints[whichstat] = 0
+			return
+		if other.charclass:
+			self.setclass(other.charclass)
+		for whichstat in toolbox.statnums:
+			if other.statbases[whichstat]:
+				self.statbases[whichstat] = other.statbases[whichstat]
+			else:
+				self.statbases[whichstat] += self.statpoints[whichstat]
+			self.statpoints[whichstat] = other.statpoints[whichstat]
+		if other.statday:
+			self.setstatday(other.statday)
+		if other.ml is not None:
+			self.ml = other.ml
+		if other.combat is not None:
+			self.combat = other.combat
+		if other.init is not None:
+			self.init = other.init
+		if other.stat is not None:
+			self.stat = other.stat
+		if other.meat is not None:
+			self.meat = other.meat
+		if other.item is not None:
+			self.item = other.item
+	def overview(self):
+		st = "Metadata"
+		if self.charclass:
+			st += "\n	Class: %s" % self.charclass
+			st += " (%s)" % statword( self.mainstatnum )
+		if self.statday:
+			st += "\n	Stat day: %s" % self.statday
+		if sum(self.statbases):
+			st += "\n	Stats: " + " / ".join( [str(n) for n in self.statbases] )
+		for whichstat in toolbox.statnums:
+			if self.statpoints[whichstat]:
+				st += "\n	Gained %d " % self.statpoints[whichstat]
+				st += statword( whichstat )
+		if self.ml is not None:
+			st += "\n	Monster level adjustment: %+d" % self.ml
+		if self.combat is not None:
+			st += "\n	Combat rate modifier: %+d%%" % self.combat
+		if self.init is not None:
+			st += "\n	Initiative bonus: %+d%%" % self.init
+			if self.ml is not None and self.ml > 20:
+				st += " (%d after ML)" % self.initiative()[0]
+		if self.stat is not None:
+			st += "\n	Bonus stats: %+.2f" % self.stat
+		if self.meat is not None:
+			st += "\n	Meat multiplier: %.4f" % self.meat
+		if self.item is not None:
+			st += "\n	Item multiplier: %.4f" % self.item
+		return st
+	def details(self):
+		return self.overview()
+	def record(self):
+		return (
+			self.charclass, self.mainstatnum, self.statbases, self.statpoints,
+			self.statday, self.statdaynum, self.ml, self.combat, self.init,
+			self.real_init, self.stat, self.meat, self.item )
+	@staticmethod
+	def from_record(record):
+		metadata = metadata_class.__new__(metadata_class)
+		(	metadata.charclass, metadata.mainstatnum, metadata.statbases,
+			metadata.statpoints, metadata.statday, metadata.statdaynum,
+			metadata.ml, metadata.combat, metadata.init, metadata.real_init,
+			metadata.stat, metadata.meat, metadata.item ) = record
+		return metadata
+
+#Functions
+
+try:
+	# HTMLParser.unescape was removed in python 3.9
+	from html import unescape as unescape_html
+except ImportError:
+	def unescape_html(s):
+		if toolbox.html_parser is None:
+			toolbox.html_parser = html_parser.HTMLParser()
+		return toolbox.html_parser.unescape(s)
+
+# A log has the same few monster names and titles over and over, so each is
+# only unescaped once, and they all come back as the same string.
+unescape = memoized( unescape_html )
+
+def statwords():
+	'''Return a dict from every way a log spells a stat to its number.  It
+	is built the first time it's needed.'''
+	if toolbox.statwords is None:
+		words = {}
+		for whichstat, spellings in enumerate( toolbox.statspellings ):
+			for word in spellings:
+				words[word] = whichstat
+				words[word.title()] = whichstat
+				words[word.lower()] = whichstat
+		toolbox.statwords = words
+	return toolbox.statwords
+
+def statnum(statword):
+	'''Return the number of a stat, given the number or any way a log spells
+	it.  A spelling that isn't in statwords() as it is gets put in title case,
+	and what that finds is remembered for next time.'''
+	numbers = toolbox.statnumbers
+	if numbers is None:
+		numbers = toolbox.statnumbers = dict( statwords() )
+		for whichstat in toolbox.statnums:
+			numbers[whichstat] = whichstat
+	whichstat = numbers.get(statword)
+	if whichstat is None:
+		whichstat = numbers[statword] = statwords()[ str(statword).title() ]
+	return whichstat
+
+def statword(whichstat):
+	return toolbox.statnums[ statnum(whichstat) ]
+
+def add_data(dic, key, val):
+	'''Add val to the list at dic[key], creating it first if needed.'''
+	if key in dic:
+		dic[key].append(val)
+	else:
+		dic[key] = [val]
+
+def classify(line):
+	'''Work out what the parser needs to know about one line.  Cheap prefix
+	and substring tests decide which of the searches patterns could possibly
+	match, and only those are run.  The kinds are tried in the same order
+	that parse_encounter() checks them in.  Return a linematch.'''
+	if not line:
+		return nomatch
+	result = None
+	steal = " tries to steal an item!" in line
+	deal = ( " brokers a quick deal" in line and
+		searches.re_deal.search( line ) is not None )
+	first = line[0]
+	if first == "[":
+		match = searches.re_adventure.match( line )
+		if match:
+			result = linematch( "adventure", match )
+	if result is None:
+		result = classify_meta( line, first )
+	if result is None:
+		result = classify_encounter( line, first )
+	if result is None:
+		if not ( steal or deal ):
+			return nomatch
+		result = linematch()
+	result.steal = steal
+	result.deal = deal
+	return result
+
+def classify_meta(line, first):
+	'''Look for the metadata lines: the player's state on login, and the
+	[kol_parse] lines from bbs_kol_parse.ash.'''
+	result = None
+	if first == "C" and line.startswith( "Class: " ):
+		match = searches.re_charclass.match( line )
+		if match:
+			result = linematch( "charclass", match )
+	if result is None and first == "M" and line[:5] in ( "Mus: ", "Mys: ", "Mox: " ):
+		match = searches.re_statbase.match( line )
+		if match:
+			result = linematch( "statbase", match )
+	if result is None and " bonus today" in line:
+		match = searches.re_statday.match( line )
+		if match:
+			result = linematch( "statday", match )
+	if result is None and first in "MEI" and line.startswith( searches.bonus_crap_prefixes ):
+		match = searches.re_bonus_crap.match( line )
+		if match:
+			result = linematch( "bonus_crap", match )
+	if result is not None:
+		result.outside_combat = True
+	if result is None and first == "Y" and line.startswith( "You gain a " ):
+		match = searches.re_statpoint.match( line )
+		if match:
+			result = linematch( "statpoint", match )
+	if "[kol_parse];" in line:
+		bbs_info = []
+		start = 0
+		while True:
+			match = searches.re_bbs_info.search( line, start )
+			if match:
+				bbs_info.append( match )
+				start = match.end()
+			else:
+				break
+		if bbs_info:
+			if result is None:
+				result = linematch( "bbs_info" )
+			result.bbs_info = bbs_info
+			result.outside_combat = True
+	return result
+
+def classify_encounter(line, first):
+	'''Look for the lines that make up an adventure.'''
+	if first == "E" and line.startswith( "Encounter: " ):
+		match = searches.re_encounter.match( line )
+		if match:
+			return linematch( "encounter", match )
+	round = None
+	if first == "R" and line.startswith( "Round " ):
+		round = searches.re_round.match( line )
+	you = first == "Y"
+	result = None
+	if " wins initiative!" in line:
+		result = linematch( "jump" )
+	if result is None and line.endswith( " damage." ):
+		match = searches.re_mondmg.search( line )
+		if match:
+			result = linematch( "mondmg", match )
+	if result is None and you and line.startswith( "You lose " ):
+		match = searches.re_losehp.match( line )
+		if match:
+			result = linematch( "losehp", match )
+	if result is None and you and line.startswith( "You acquire an effect: " ):
+		match = searches.re_geteffect.match( line )
+		if match:
+			result = linematch( "geteffect", match )
+	if result is None and " wins the fight!" in line:
+		result = linematch( "win" )
+	if result is None and you and line.startswith( "You gain " ):
+		match = searches.re_meat.match( line )
+		if match:
+			result = linematch( "meat", match )
+	if result is None and line == "Rave combo: Rave Steal":
+		result = linematch( "ravesteal" )
+	if result is None and you and line.startswith( "You acquire " ):
+		match = searches.re_item.match( line )
+		if match:
+			result = linematch( "item", match )
+		else:
+			match = searches.re_multi_item.match( line )
+			if match:
+				result = linematch( "multi_item", match )
+	if result is None and you and line.startswith( "You gain " ):
+		match = searches.re_gainstat.match( line )
+		if match:
+			result = linematch( "gainstat", match )
+	if result is None and round is None:
+		return None
+	if result is None:
+		result = linematch()
+	result.round = round
+	return result
+
+def parse_encounter(lines, progress=None, classify=classify):
+	'''Parse one encounter from a lineiter.  Return an encounter object, or None
+	if there are no lines left.  At the debug level, progress is told about
+	every adventure.  classify can be replaced, e.g. by a profiler's.'''
+	debug = progress is not None and progress.level >= progress.debug
+	enc = encounter()
+	lines_parsed = 0
+	# The lines from the adventure line on, for linehash
+	raw = []
+	matches = None
+	round = None
+	ravestealing = 0
+	for line in lines:
+		lines_parsed += 1
+		if enc.location and not line:
+			# There are no blank lines in an encounter, so this one is over.
+			break
+		stealing = bool( matches and matches.steal )
+		dealing = bool( matches and matches.deal )
+		if ravestealing:
+			ravestealing -= 1
+		if line is skipped_line:
+			matches = nomatch
+			continue
+		if enc.location:
+			raw.append( line )
+		matches = classify(line)
+		if matches is nomatch:
+			continue
+		kind = matches.kind
+		if kind == "adventure":
+			if enc.location:
+				# Looks like we bumped into the next adventure. Pack it up.
+				if debug:
+					progress.note( "Parsing interrupted by another adventure." )
+				lines.pushback( line )
+				break
+			n, location = matches.match.groups()
+			enc.location = intern_name(location)
+			enc.num = int(n)
+			if debug:
+				progress.note( "Parsing Adventure %d: %s" % ( enc.num, enc.location ) )
+			continue
+		#
+		# metadata
+		#
+		if matches.outside_combat and enc.location:
+			lines.pushback( line )
+			break
+		if kind == "charclass":
+			enc.changemetadata().setclass( matches.match.groups()[0] )
+			continue
+		if kind == "statbase":
+			whichstat, buffed, dummy, base = matches.match.groups()
+			if not base:
+				base = buffed
+			enc.changemetadata().setstatbase( whichstat, base )
+			continue
+		if kind == "statday":
+			enc.changemetadata().setstatday( matches.match.groups()[0] )
+			continue
+		if kind == "bonus_crap":
+			key, val = matches.match.groups()
+			enc.changemetadata().setval( key, val )
+			continue
+		if kind == "statpoint":
+			enc.changemetadata().gainstatpoint( matches.match.groups()[0] )
+			continue
+		if kind == "bbs_info":
+			for m in matches.bbs_info:
+				key, val = m.groups()
+				enc.changemetadata().setval( key, val )
+			continue
+		#
+		# encounter stuff
+		#
+		if not enc.location:
+			# Don't record encounter data until the encounter actually begins.
+			continue
+		if kind == "encounter":
+			title, = matches.match.groups()
+			enc.title = unescape(title)
+			continue
+		if matches.round:
+			n, = matches.round.groups()
+			round = int(n)
+			enc.iscombat = True
+		if kind == "jump":
+			enc.jump = True
+			continue
+		if kind == "mondmg":
+			name, n = matches.match.groups()
+			enc.monstername = unescape(name)
+			add_data( enc.mondamages, round, int(n) )
+			continue
+		if kind == "losehp":
+			# todo: count damage taken
+			continue
+		if kind == "geteffect":
+			name, n = matches.match.groups()
+			enc.effects.append( intern_name(name) )
+			continue
+		if kind == "win":
+			enc.won = True
+			continue
+		if kind == "meat":
+			if sum(enc.stats):
+				# You don't get meat after stats
+				lines.pushback( line )
+				break
+			if enc.won:
+				n, = matches.match.groups()
+				enc.meat = int(n)
+			continue
+		if kind == "ravesteal":
+			ravestealing = 3
+			continue
+		if kind == "item" or kind == "multi_item":
+			if sum(enc.stats):
+				# You don't get items after stats
+				lines.pushback( line )
+				break
+			itemname = ""
+			num = 1
+			if kind == "item":
+				itemname, = matches.match.groups()
+			else:
+				itemname, num = matches.match.groups()
+				num = int(num)
+			itemname = intern_name(itemname)
+			if stealing or ravestealing:
+				enc.stolenitems.extend( [itemname] * num )
+			elif dealing:
+				enc.miscitems.extend( [itemname] * num )
+			elif enc.won:
+				enc.items.extend( [itemname] * num )
+			else:
+				enc.miscitems.extend( [itemname] * num )
+			continue
+		if kind == "gainstat" and enc.won:
+			n, whichstat = matches.match.groups()
+			n, whichstat = int(n), statnum(whichstat)
+			if whichstat in toolbox.statnums:
+				enc.stats[whichstat] = n
+			continue
+	#
+	# end parsing loop
+	#
+	if not lines_parsed:
+		return None
+	if lines.pushed and raw:
+		# The line we pushed back belongs to the next encounter.
+		raw.pop()
+	if raw:
+		enc.linehash = zlib.crc32( "\n".join(raw).encode("utf-8") ) & 0xffffffff
+	if enc.iscombat and not enc.monstername:
+		enc.monstername = enc.title
+	return enc
+
+def parselines(lines, until=None, progress=None, profile=None):
+	'''Parse an iterable of lines as KoL encounters.  Yield encounter objects.
+	If until is given, stop before starting an encounter on or after that line
+	number.  progress is a progress_meter to update as encounters are found,
+	and profile a profiler to add the time spent here to.'''
+	if not isinstance(lines, lineiter):
+		lines = lineiter(lines)
+	classify_line = classify
+	if profile is not None:
+		classify_line = profile.classifier()
+		# The classify stage's time, which parse_encounter leaves out
+		classified = profile.stage("classify")
+	while until is None or lines.count < until:
+		if profile is not None:
+			started = time.time()
+			first = lines.count
+			matching = classified[0]
+		enc = parse_encounter(lines, progress, classify_line)
+		if enc is None:
+			break
+		if progress is not None:
+			progress.update( lines.count )
+		if profile is not None:
+			profile.add( "parse_encounter",
+				time.time() - started - ( classified[0] - matching ), 1, lines.count - first )
+		yield enc
+
+def parse(lines, progress=None, profile=None):
+	'''Parse an iterable of log lines, with or without their line endings.
+	Return an iterator over the encounters, which are found as the lines are
+	read.'''
+	return parselines(
+		( line.rstrip("\r\n") for line in lines ), progress=progress, profile=profile )
@@ -0,0 +1,151 @@
+'''
+Optional timing and counting of each stage, for finding out why a report is
+slow.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import io
+import json
+import time
+import collections
+
+from .parser import classify, nomatch
+
+# The best clock for timing short things: time.time() only ticks every
+# 16ms on Windows.  Python 2 has no perf_counter.
+clock = getattr( time, "perf_counter", time.time )
+
+#Classes
+
+class profiler(object):
+	'''Collects the wall time, calls and lines of each stage of a run, and
+	how often each of the searches patterns matched.  Nothing is collected
+	unless a profiler is passed in, so there is no cost when it is off.
+
+	stages maps a stage name to [seconds, calls, lines].  kinds counts the
+	linematch kinds that classify() found, see hits().  skipped counts the
+	lines that decode_lines() skipped.  crunches is how many times the
+	monsters' statistics were worked out, and monsters how many monsters
+	there were, see write_report(); with nothing crunched twice, they are
+	the same.
+
+	The regex matching is timed line by line as the classify stage, and
+	parselines() leaves it out of parse_encounter, which is then only the
+	time spent putting encounters together.'''
+	version = 4
+	def __init__(self):
+		self.stages = collections.OrderedDict()
+		self.kinds = collections.Counter()
+		self.skipped = 0
+		self.crunches = 0
+		self.monsters = 0
+	def stage(self, name):
+		'''Return the [seconds, calls, lines] of a stage, creating it if
+		needed.'''
+		stage = self.stages.get(name)
+		if stage is None:
+			stage = self.stages[name] = [0.0, 0, 0]
+		return stage
+	def add(self, name, seconds, calls=1, lines=0):
+		stage = self.stage(name)
+		stage[0] += seconds
+		stage[1] += calls
+		stage[2] += lines
+	def classifier(self):
+		'''Return a function that works like classify() but also counts what
+		it finds, and adds the time it takes to the classify stage.'''
+		kinds = self.kinds
+		stage = self.stage("classify")
+		def counting_classify(line):
+			started = clock()
+			result = classify(line)
+			stage[0] += clock() - started
+			stage[1] += 1
+			stage[2] += 1
+			if result is not nomatch:
+				kind = result.kind
+				if kind and kind != "bbs_info":
+					kinds[kind] += 1
+				if result.bbs_info:
+					kinds["bbs_tag"] += 1
+					kinds["bbs_info"] += len(result.bbs_info)
+				if result.round:
+					kinds["round"] += 1
+				if result.steal:
+					kinds["steal"] += 1
+				if result.deal:
+					kinds["deal"] += 1
+			return result
+		return counting_classify
+	def hits(self):
+		'''Return a dict from the name of each searches pattern to the number
+		of lines it matched.  For re_bbs_info it is the number of values.'''
+		return dict( [ ( "re_" + kind, n ) for kind, n in self.kinds.items() ] )
+	def merge(self, other):
+		'''Add the numbers from the record() of another profiler, e.g. one
+		from a worker process.'''
+		for name, seconds, calls, lines in other["stages"]:
+			self.add( name, seconds, calls, lines )
+		for name, n in other["hits"].items():
+			self.kinds[ name[3:] ] += n
+		self.skipped += other["skipped"]
+		self.crunches += other["crunches"]
+		self.monsters += other["monsters"]
+	def record(self):
+		return {
+			"version": profiler.version,
+			"stages": [ ( name, stage[0], stage[1], stage[2] )
+				for name, stage in self.stages.items() ],
+			"hits": self.hits(),
+			"skipped": self.skipped,
+			"crunches": self.crunches,
+			"monsters": self.monsters }
+	def save(self, path):
+		'''Write the numbers to path as JSON.'''
+		record = self.record()
+		record["stages"] = [
+			{ "name": name, "seconds": seconds, "calls": calls, "lines": lines }
+			for name, seconds, calls, lines in record["stages"] ]
+		with io.open( path, "w", encoding="utf-8" ) as f:
+			f.write( json.dumps( record, indent=1, sort_keys=True ) )
+	def overview(self):
+		'''Return lines describing each stage, then the pattern hits.'''
+		lines = []
+		for name, (seconds, calls, count) in self.stages.items():
+			st = "%s: %.3f s, %d call%s" % ( name, seconds, calls, "" if calls == 1 else "s" )
+			if count:
+				st += ", %d lines" % count
+				if seconds:
+					st += " (%.0f lines/s)" % ( count / seconds )
+			elif calls > 1 and seconds:
+				st += " (%.1f us each)" % ( seconds * 1e6 / calls )
+			lines.append( st )
+		if "decode_lines" in self.stages:
+			total = self.stages["decode_lines"][2]
+			lines.append( "Skipped %d of %d lines without decoding them (%.1f%%)" % (
+				self.skipped, total, 100.0 * self.skipped / max( total, 1 ) ) )
+		if self.monsters:
+			lines.append( "Crunched the statistics of %d monsters %d times" % (
+				self.monsters, self.crunches ) )
+		hits = self.hits()
+		if hits:
+			lines.append( "Pattern hits: " + ", ".join(
+				[ "%s %d" % (name, hits[name]) for name in sorted( hits, key=lambda name: -hits[name] ) ] ) )
+		return lines
+
+class timed(object):
+	'''with timed(profile, name): adds the time the block takes to a stage
+	of profile, which may be None.'''
+	__slots__ = ( "profile", "name", "calls", "lines", "started" )
+	def __init__(self, profile, name, calls=1, lines=0):
+		self.profile = profile
+		self.name = name
+		self.calls = calls
+		self.lines = lines
+	def __enter__(self):
+		self.started = time.time()
+		return self
+	def __exit__(self, *exc):
+		if self.profile is not None:
+			self.profile.add( self.name, time.time() - self.started, self.calls, self.lines )
+		return False
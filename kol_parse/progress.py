@@ -0,0 +1,100 @@
+'''
+Show how parsing is going.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import sys
+import time
+
+#Classes
+
+class progress_meter(object):
+	'''Shows how parsing is going, at one of three levels.  silent shows
+	nothing.  summary shows which files are parsed and, at most once every
+	interval seconds, the lines and adventures parsed per second and how long
+	the rest should take.  debug also shows every adventure as it is parsed.
+
+	Call expect() with the size of everything that will be parsed, start()
+	and end() around each file, and update() as encounters are parsed.'''
+	silent = 0
+	summary = 1
+	debug = 2
+	def __init__(self, level=summary, out=None, interval=0.25):
+		self.level = level
+		self.out = out
+		self.interval = interval
+		self.total_bytes = 0 # of everything that will be parsed
+		self.done_bytes = 0 # of the files that are finished
+		self.done_lines = 0
+		self.lines = 0
+		self.adventures = 0
+		self.tell = None # returns how far into the current file we are
+		self.started = None
+		self.shown = 0.0
+		self.pending = False # a rate line is waiting to be overwritten
+	def write(self, text, end="\n"):
+		out = self.out or sys.stdout
+		if self.pending:
+			out.write( "\n" )
+			self.pending = False
+		out.write( text + end )
+		if end == "\r":
+			self.pending = True
+			out.flush()
+	def message(self, text):
+		'''Show text at the summary level and up.'''
+		if self.level >= progress_meter.summary:
+			self.write( text )
+	def note(self, text):
+		'''Show text at the debug level.'''
+		if self.level >= progress_meter.debug:
+			self.write( text )
+	def expect(self, size):
+		'''Add size bytes to the amount that will be parsed.'''
+		if self.started is None:
+			self.started = time.time()
+		self.total_bytes += size
+	def start(self, tell=None):
+		'''Begin a file.  tell() returns how many bytes of it have been read.'''
+		if self.started is None:
+			self.started = time.time()
+		self.tell = tell
+	def end(self, lines, size):
+		'''Finish a file of lines lines and size bytes.'''
+		self.done_lines += lines
+		self.done_bytes += size
+		self.lines = self.done_lines
+		self.tell = None
+	def update(self, lines, adventures=1, position=None):
+		'''Count adventures more encounters.  lines is how many lines of the
+		current file have been parsed, and position how many bytes, if tell()
+		can't say.'''
+		self.adventures += adventures
+		self.lines = self.done_lines + lines
+		if self.level == progress_meter.summary:
+			now = time.time()
+			if now - self.shown >= self.interval:
+				self.shown = now
+				self.show( now, position )
+	def show(self, now, position=None):
+		out = self.out or sys.stdout
+		elapsed = max( now - (self.started or now), 1e-6 )
+		st = "%d lines (%.0f/s), %d adventures (%.0f/s)" % (
+			self.lines, self.lines / elapsed,
+			self.adventures, self.adventures / elapsed )
+		if position is None and self.tell:
+			position = self.tell()
+		if self.total_bytes:
+			done = self.done_bytes + (position or 0)
+			st += ", %d%%" % min( 100 * done // self.total_bytes, 100 )
+			if done:
+				eta = max( self.total_bytes - done, 0 ) * elapsed / done
+				st += ", ETA %d:%02d" % divmod( int(eta + 0.5), 60 )
+		isatty = getattr( out, "isatty", None )
+		self.write( st, "\r" if isatty and isatty() else "\n" )
+	def finish(self):
+		'''Show the final rates.'''
+		if self.level == progress_meter.summary and self.started is not None:
+			self.show( time.time() )
+			if self.pending:
+				self.write( "", "" )
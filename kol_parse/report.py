@@ -0,0 +1,137 @@
+'''
+Write the HTML report.
+'''
+from __future__ import print_function, division, unicode_literals
+
+import io
+
+from .profiling import timed
+
+#Classes
+
+class templates(object):
+	head = '''<html><head><meta charset="UTF-8">
+	<style type="text/css">
+		body {font-family: sans-serif; font-size: small;}
+		h4 {margin-bottom: 0;}
+		.invis {display: none;}
+		div#anal, div#details, div#item {background-color: #eeeeee;}
+	</style>
+	<script src="http://ajax.googleapis.com/ajax/libs/jquery/1.4.2/jquery.min.js"></script>
+	<script type="text/javascript">
+		function toggle_invis(target, button)
+		{
+			if( button )
+			{
+				if( button.value=="Expand" )
+				{
+					$(target).find("div.invis").attr("class", "uninvis");
+					button.value="Collapse";
+				}
+				else
+				{
+					$(target).find("div.uninvis").attr("class", "invis");
+					button.value="Expand";
+				}
+			}
+			else
+			{
+				if( target.className == "invis" )
+					target.className = "uninvis";
+				else
+					target.className = "invis";
+			}
+		}
+	</script>\n</head>\n<body>\n'''
+	foot = "</body></html>"
+	section = (
+		"<div id='%(id)s'><h3>%(title)s</h3>\n"
+		"<input type='button' value='%(button)s' onclick='toggle_invis(\"div#%(id)s\",this)'>" )
+	notes = '''
+Monster levels are estimated with +stat boni and stat days factored in.
++exp bonus is assumed to consist entirely of general +stats and +ML.
+Moon sign is assumed to give +10% to your mainstat.
+Other than moon sign and stat days, percentile bonuses to stat gains (like April Shower effects) are not considered.'''
+
+
+class report(object):
+	'''Builds the HTML report in memory and writes it to path in big
+	pieces.  Nothing is flushed until checkpoint() or close().'''
+	chunk = 1<<20
+	def __init__(self, path):
+		self.path = path
+		self.file = None
+		self.parts = []
+		self.size = 0
+	def write(self, text):
+		self.parts.append( text )
+		self.size += len(text)
+		if self.size >= report.chunk:
+			self.spill()
+	def spill(self):
+		if self.file is None:
+			self.file = io.open( self.path, "w", encoding="utf-8" )
+		self.file.write( "".join(self.parts) )
+		self.parts = []
+		self.size = 0
+	def checkpoint(self):
+		'''Make sure everything so far is on disk.'''
+		self.spill()
+		self.file.flush()
+	def close(self):
+		self.spill()
+		self.file.close()
+	def log(self, *args, **kwargs):
+		# The signature for this method was log(*args,tag="br"), but Python 2.7 does
+		# not support named arguments after a *args, so I read tag from kwargs.
+		tag = kwargs.get('tag','br')
+		if tag and tag != "br":
+			self.write( "<%s>" % tag )
+		if args:
+			message = " ".join( [str(arg) for arg in args] ).replace( "\n", "<br>\n" )
+			self.write( message )
+			if tag == "br":
+				self.write( "<br>\n" )
+			elif tag:
+				if " " in tag:
+					tag = tag[ : tag.find(" ") ]
+				self.write( "</%s>\n" % tag )
+	def section(self, id, title, blocks, expanded=False, tag="br"):
+		'''Write a section with a button that expands or collapses it, and
+		log each of blocks inside it.'''
+		self.write( templates.section % {
+			"id": id, "title": title,
+			"button": "Collapse" if expanded else "Expand" } )
+		if not expanded:
+			self.write( "<div class='invis'>" )
+		for block in blocks:
+			self.log( block, tag=tag )
+		if not expanded:
+			self.write( "</div>" )
+		self.write( "</div>" )
+
+#Functions
+
+def write_report(rep, monsters, analysis, profile=None):
+	'''Write the report for a list of crunched monsters.  If there is a
+	profiler, the time this takes is added to it, along with how many times
+	the monsters were crunched, and it gets a Performance section.'''
+	with timed( profile, "write_report" ):
+		# Without a trace the section is empty, but still says how many.
+		rep.section( "anal", "Analyzed %d combats" % analysis.combats, analysis.trace or () )
+		if analysis.details:
+			rep.section( "details", "Details",
+				( mon.details() for mon in monsters ), tag="div" )
+		rep.section( "item", "Items",
+			( mon.itemdetails() for mon in monsters ), tag="div" )
+		rep.section( "overview", "Overview",
+			( mon.overview() for mon in monsters ), expanded=True, tag="div" )
+	if profile is not None:
+		profile.monsters = len(monsters)
+		profile.crunches = sum( [mon.crunches for mon in monsters] )
+		rep.section( "performance", "Performance", profile.overview() )
+	rep.log( templates.notes )
+	if analysis.errors:
+		rep.log( "\nErrors:" )
+		for error in analysis.errors:
+			rep.log( error )
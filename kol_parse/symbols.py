@@ -0,0 +1,71 @@
+'''
+Names found in logs, like monsters, items, effects and locations, which come
+up over and over.  Each one is unescaped once, kept as one string however
+many times it is found, and given a small integer id where it is counted.
+'''
+from __future__ import print_function, division, unicode_literals
+
+try:
+	from functools import lru_cache
+except ImportError:
+	# Python 2
+	lru_cache = None
+
+try:
+	from sys import intern
+except ImportError:
+	# Python 2's intern() only takes byte strings, and names are unicode, so
+	# intern_name() keeps its own table.
+	intern = None
+
+# How many different names the memoized functions remember.  Logs have far
+# fewer than this, so in practice nothing is forgotten.
+cache_size = 1 << 14
+
+#Classes
+
+class symbols(object):
+	'''Interns names as small integer ids.'''
+	__slots__ = ( "ids", "names" )
+	def __init__(self):
+		self.ids = {}
+		self.names = []
+	def id(self, name):
+		i = self.ids.get(name)
+		if i is None:
+			i = self.ids[name] = len(self.names)
+			self.names.append(name)
+		return i
+	def __getitem__(self, i):
+		return self.names[i]
+	def __len__(self):
+		return len(self.names)
+
+#Functions
+
+def memoized(function, maxsize=cache_size):
+	'''Return function, which takes one argument, with its results cached.
+	The least recently used results are dropped once there are maxsize of
+	them.  Python 2 has no lru_cache, so there the cache is emptied instead.'''
+	if lru_cache is not None:
+		return lru_cache(maxsize)(function)
+	cache = {}
+	def cached(arg):
+		result = cache.get(arg)
+		if result is None:
+			if len(cache) >= maxsize:
+				cache.clear()
+			result = cache[arg] = function(arg)
+		return result
+	cached.__doc__ = function.__doc__
+	return cached
+
+# intern_name(name) returns the copy of name that was seen first, so that a
+# name found many times is one string.  Comparing and hashing it is then
+# cheaper too, since a string remembers its hash.
+if intern is not None:
+	intern_name = intern
+else:
+	interned = {}
+	def intern_name(name):
+		return interned.setdefault( name, name )